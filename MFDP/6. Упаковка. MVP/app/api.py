@@ -5,8 +5,15 @@ from routes.user import user_route
 from routes.event import event_route
 from routes.model import model_route
 from routes.tank import tank_route
-from database.database import init_db
+from services.startup.startup import StartupStages, warmup, start_background_warmup
 from database.config import get_settings
+from database.database import engine
+from database.instrumentation import QueryStatsMiddleware, log_slow_queries
+from ml.registry import PredictorRegistry
+from ml.cache import ResultCache
+from services.crud.tank import TankCatalogCache
+from services.rm.rm import publisher
+from concurrent.futures import ThreadPoolExecutor
 import uvicorn
 from loguru import logger
 
@@ -36,7 +43,11 @@ def create_application() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-DB-Queries", "X-DB-Rows", "X-DB-Time-Ms", "X-Next-Cursor", "X-Prev-Cursor", "Link"],
     )
+    # Счётчики запросов к БД на каждый запрос: заголовки X-DB-* и /health/db
+    app.add_middleware(QueryStatsMiddleware)
+    log_slow_queries(settings.SLOW_QUERY_MS or None)
 
     # Register routes
     app.include_router(home_route, tags=['Home'])
@@ -45,6 +56,19 @@ def create_application() -> FastAPI:
     app.include_router(model_route, prefix='/api/models', tags=['Models'])
     app.include_router(tank_route, prefix='/api/tanks', tags=['Tanks'])
 
+    # Loaded predictors shared by all requests
+    app.state.models = PredictorRegistry(max_items=settings.PREDICTOR_CACHE_SIZE,
+                                         max_bytes=settings.PREDICTOR_CACHE_MAX_MB * 2 ** 20 or None)
+    app.state.results = ResultCache(ttl=settings.RESULT_CACHE_TTL, max_items=settings.RESULT_CACHE_SIZE,
+                                    shared_url=settings.RESULT_CACHE_URL)
+    # Короткий TTL: изменения прав из других реплик применяются не позже чем через PRINCIPAL_CACHE_TTL секунд
+    app.state.principals = ResultCache(ttl=settings.PRINCIPAL_CACHE_TTL, max_items=settings.PRINCIPAL_CACHE_SIZE)
+    app.state.predict_executor = ThreadPoolExecutor(max_workers=settings.PREDICT_WORKERS,
+                                                    thread_name_prefix="predict")
+    app.state.startup = StartupStages()
+    # Каталог танков текущей версии: JSON с ETag, кандидаты модели; следит за новыми версиями снимка
+    app.state.tanks = TankCatalogCache(engine=engine)
+
     return app
 
 
@@ -53,11 +77,14 @@ app = create_application()
 
 @app.on_event("startup")
 def on_startup():
+    if settings.FAST_START:
+        # Сервер начинает отвечать сразу, готовность отдаёт /health/ready
+        logger.info("Fast start: warming up in background...")
+        start_background_warmup(app)
+        return
     try:
         logger.info("Initializing database...")
-        general_df, premium_df = init_db(drop_all=True)
-        app.state.general_df = general_df
-        app.state.premium_df = premium_df
+        warmup(app, drop_all=True)
         logger.info("Application startup completed successfully")
     except Exception as e:
         logger.error(f"Startup failed: {str(e)}")
@@ -68,6 +95,9 @@ def on_startup():
 async def shutdown_event():
     """Cleanup on application shutdown."""
     logger.info("Application shutting down...")
+    app.state.predict_executor.shutdown(wait=False, cancel_futures=True)
+    publisher.close()
+    app.state.tanks.stop()
 
 
 if __name__ == '__main__':
@@ -15,10 +15,32 @@ class Settings(BaseSettings):
     APP_DESCRIPTION: Optional[str] = None
     DEBUG: Optional[bool] = None
     API_VERSION: Optional[str] = None
+
+    # Loaded predictors kept in memory
+    PREDICTOR_CACHE_SIZE: int = 2
+    PREDICTOR_CACHE_MAX_MB: int = 0
+
+    # Bind immediately and warm up in background, without dropping the schema
+    FAST_START: bool = False
+
+    # Threads running model loading and inference
+    PREDICT_WORKERS: int = 2
+
+    # Prediction results cache
+    RESULT_CACHE_TTL: int = 600
+    RESULT_CACHE_SIZE: int = 10000
+    RESULT_CACHE_URL: Optional[str] = None
+
+    # Authenticated users (user_id, is_admin) cached by token
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_SIZE: int = 10000
+
+    # Queries slower than this are logged with parameters and EXPLAIN, 0 disables the log
+    SLOW_QUERY_MS: int = 200
     
     @property
     def DATABASE_URL_asyncpg(self):
-        return f'postgresql+asyncpg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}'
+        return f'postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}'
     
     @property
     def DATABASE_URL_psycopg(self):
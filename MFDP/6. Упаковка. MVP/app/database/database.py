@@ -1,12 +1,16 @@
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import case, inspect, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
 from .config import get_settings
-from models.event import Prediction
+from models.event import Prediction, PredictionCandidate, PREDICTION_DONE, PREDICTION_PENDING
 from models.user import User
 from models.model import Model
 from services.crud.user import create_user, get_user_by_id
 from services.crud.event import update_model_event
 from services.crud.model import get_model_by_params, init_model, add_model
 from services.crud.tank import init_tanks
+from ml.prediction import CandidateBlock
 
 def get_database_engine():
     """
@@ -29,32 +33,131 @@ def get_database_engine():
 
 engine = get_database_engine()
 
+
+def get_async_database_engine():
+    """
+    Create and config the SQLAlchemy async engine on asyncpg.
+
+    Returns:
+        AsyncEngine: Configured SQLAlchemy async engine.
+    """
+    settings = get_settings()
+
+    async_engine = create_async_engine(
+        url=settings.DATABASE_URL_asyncpg,
+        echo=settings.DEBUG,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=3600
+    )
+    return async_engine
+
+async_engine = get_async_database_engine()
+
 def get_session():
     with Session(engine) as session:
         yield session
-        
-def init_db(drop_all: bool = False):
+
+
+async def get_async_session():
+    # expire_on_commit=False: атрибуты объектов остаются доступны после commit без ленивой загрузки
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+def init_schema(drop_all: bool = False) -> None:
+    """
+    Create missing tables.
+
+    Args:
+        drop_all: If True, drops all tables before creation.
+    """
+    engine = get_database_engine()
+    if drop_all:
+        SQLModel.metadata.drop_all(engine)
+
+    SQLModel.metadata.create_all(engine)
+    upgrade_schema(engine)
+    check_schema(engine)
+
+
+def upgrade_schema(engine) -> None:
+    """
+    Bring tables created by an older version up to date.
+
+    create_all skips existing tables, so the columns and indexes added since
+    are created here: Prediction.status (predictions that already have
+    candidates become done, the rest pending), Model.artifact_path and the
+    history indexes.
+
+    Args:
+        engine: SQLAlchemy engine.
+    """
+    columns = {col["name"] for col in inspect(engine).get_columns(Prediction.__tablename__)}
+    model_columns = {col["name"] for col in inspect(engine).get_columns(Model.__tablename__)}
+    with engine.begin() as conn:
+        if "artifact_path" not in model_columns:
+            # NULL: модель обслуживается из исходного пути, пока артефакт не экспортирован
+            conn.execute(text(f"ALTER TABLE {Model.__tablename__} ADD COLUMN artifact_path VARCHAR"))
+        if "status" not in columns:
+            conn.execute(text(f"ALTER TABLE {Prediction.__tablename__} ADD COLUMN status VARCHAR"))
+            has_candidates = select(PredictionCandidate.uid).where(
+                PredictionCandidate.prediction_id == Prediction.prediction_id).exists()
+            conn.execute(update(Prediction.__table__).values(
+                status=case((has_candidates, PREDICTION_DONE), else_=PREDICTION_PENDING)))
+        for index in Prediction.__table__.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def check_schema(engine) -> None:
+    """
+    Check that every table has the columns the models declare.
+
+    Args:
+        engine: SQLAlchemy engine.
+
+    Raises:
+        RuntimeError: Listing the missing columns, if upgrade_schema left any behind.
+    """
+    db = inspect(engine)
+    missing = []
+    for table in SQLModel.metadata.sorted_tables:
+        columns = {col["name"] for col in db.get_columns(table.name)}
+        missing += [f"{table.name}.{col.name}" for col in table.columns if col.name not in columns]
+    if missing:
+        raise RuntimeError(f"Database schema is out of date, missing columns: {', '.join(missing)}")
+
+
+def init_db(drop_all: bool = False, registry=None):
     """
     Initialize database schema.
 
     Args:
         drop_all: If True, drops all tables before creation.
+        registry: Registry of loaded predictors to warm with the demo model.
 
     Raises:
         Exception: Any database-related exception.
     """
     try:
-        engine = get_database_engine()
-        if drop_all:
-            SQLModel.metadata.drop_all(engine)
-
-        SQLModel.metadata.create_all(engine)
-        general_df, premium_df = init_demo_data()
+        init_schema(drop_all)
+        general_df, premium_df = init_demo_data(registry)
         return general_df, premium_df
     except Exception as e:
         raise
 
-def init_demo_data():
+def init_demo_data(registry=None):
+    with Session(engine) as session:
+        general_df, premium_df = init_tanks(session)
+        init_demo_users(session, general_df, CandidateBlock(premium_df), registry)
+    return general_df, premium_df
+
+
+def init_demo_users(session, general_df, candidates, registry=None) -> None:
+    """
+    Create the demo model record, demo users and their first prediction if they don't exist yet.
+    """
     demo_model = Model()
 
     demo_common_user = User(user_id=88444060)
@@ -63,13 +166,10 @@ def init_demo_data():
     demo_model_event = Prediction()
 
     demo_common_user.model_events.append(demo_model_event)
-    with Session(engine) as session:
-        general_df, premium_df = init_tanks(session)
-        if not get_user_by_id(88444060, session):
-            add_model(demo_model, session)
-            model = get_model_by_params(session)
-            model = init_model(model)
-            create_user(demo_common_user, session)
-            update_model_event(demo_model_event, session, model, general_df, premium_df)
-            create_user(demo_admin_user, session)
-    return general_df, premium_df
\ No newline at end of file
+    if not get_user_by_id(88444060, session):
+        add_model(demo_model, session)
+        model = get_model_by_params(session)
+        model = init_model(model, registry)
+        create_user(demo_common_user, session)
+        update_model_event(demo_model_event, session, model, general_df, candidates)
+        create_user(demo_admin_user, session)
@@ -0,0 +1,149 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_HEADERS = {"queries": "X-DB-Queries", "rows": "X-DB-Rows", "time_ms": "X-DB-Time-Ms"}
+
+
+class QueryStats:
+    """
+    Database queries of one request.
+
+    Attributes:
+        queries (int): Executed statements
+        rows (int): Rows reported by the driver (cursor.rowcount, where it is known)
+        time_ms (float): Time spent in the driver
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.time_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, rows: int, elapsed_ms: float) -> None:
+        with self._lock:
+            self.queries += 1
+            self.rows += max(rows, 0)
+            self.time_ms += elapsed_ms
+
+    def headers(self) -> list:
+        return [(QUERY_HEADERS["queries"].encode(), str(self.queries).encode()),
+                (QUERY_HEADERS["rows"].encode(), str(self.rows).encode()),
+                (QUERY_HEADERS["time_ms"].encode(), f"{self.time_ms:.1f}".encode())]
+
+
+class RouteQueryMetrics:
+    """
+    Per-route totals of database queries.
+
+    Attributes:
+        routes (dict): "METHOD path" -> requests, queries, max_queries, rows, time_ms
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            totals = self.routes.setdefault(route, {"requests": 0, "queries": 0, "max_queries": 0, "rows": 0,
+                                                    "time_ms": 0.0})
+            totals["requests"] += 1
+            totals["queries"] += stats.queries
+            totals["max_queries"] = max(totals["max_queries"], stats.queries)
+            totals["rows"] += stats.rows
+            totals["time_ms"] += stats.time_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {route: {**totals, "avg_queries": totals["queries"] / totals["requests"]}
+                    for route, totals in self.routes.items()}
+
+
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+route_metrics = RouteQueryMetrics()
+slow_query_ms: Optional[float] = None
+
+
+def log_slow_queries(threshold_ms: Optional[float]) -> None:
+    """Log statements slower than threshold_ms with their parameters and plan; None disables the log."""
+    global slow_query_ms
+    slow_query_ms = threshold_ms
+
+
+def _explain(conn, statement: str, parameters) -> Optional[list]:
+    # Отдельный курсор DBAPI: курсор исходного запроса ещё не прочитан, а события на нём не срабатывают
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [tuple(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(cursor.rowcount, elapsed_ms)
+
+    if slow_query_ms is not None and elapsed_ms >= slow_query_ms:
+        plan = None
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            try:
+                plan = _explain(conn, statement, parameters)
+            except Exception as e:
+                plan = f"EXPLAIN failed: {e}"
+        logger.warning(f"Slow query {elapsed_ms:.1f} ms: {statement} params={parameters} plan={plan}")
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware counting database queries per request.
+
+    Adds X-DB-Queries, X-DB-Rows and X-DB-Time-Ms response headers (for
+    streaming responses they cover the queries made before the first byte)
+    and per-route totals to route_metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + stats.headers()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_stats.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                route_metrics.record(f"{scope['method']} {route.path}", stats)
@@ -0,0 +1,167 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Accept": "application/json"}
+
+
+class LatencyStats:
+    """
+    Per-endpoint request counters.
+
+    Attributes:
+        endpoints (dict): Endpoint path -> count, errors, total_ms, max_ms
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, elapsed: float, error: bool) -> None:
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["errors"] += error
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {endpoint: {**stats, "avg_ms": stats["total_ms"] / stats["count"]}
+                    for endpoint, stats in self.endpoints.items()}
+
+
+def _endpoint(url: str) -> str:
+    return urlsplit(url).path or "/"
+
+
+def _join(base_url: str, path: str) -> str:
+    if not path:
+        return base_url
+    return f"{base_url.rstrip('/')}/{path.lstrip('/')}"
+
+
+class ApiClient:
+    """
+    Pooled HTTP client of an upstream API.
+
+    Keeps keep-alive connections per host, bounds every request with
+    (connect, read) timeouts and retries idempotent requests that failed to
+    connect or got a 429/5xx response, with exponential jittered backoff that
+    honours Retry-After. Thread-safe: one instance is shared by the process.
+
+    Attributes:
+        base_url (str): URL prefix of request paths
+        timeout (tuple): Default (connect, read) timeouts in seconds
+        stats (LatencyStats): Per-endpoint latency counters
+    """
+
+    def __init__(self, base_url: str, timeout=DEFAULT_TIMEOUT, retries: int = 3, backoff: float = 0.3,
+                 pool_size: int = 10):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.stats = LatencyStats()
+        retry = Retry(total=retries, backoff_factor=backoff, backoff_jitter=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=Retry.DEFAULT_ALLOWED_METHODS, respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, path: str = "", **kwargs) -> requests.Response:
+        url = _join(self.base_url, path)
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            self.stats.record(_endpoint(url), time.perf_counter() - start, error)
+
+    def get(self, path: str = "", **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str = "", **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncApiClient:
+    """
+    asyncio counterpart of ApiClient on httpx.AsyncClient.
+
+    Requires httpx. Same timeouts, retry policy and counters; the instance has
+    to be created and used inside one event loop.
+    """
+
+    def __init__(self, base_url: str, timeout=DEFAULT_TIMEOUT, retries: int = 3, backoff: float = 0.3,
+                 pool_size: int = 10):
+        if httpx is None:
+            raise ImportError("AsyncApiClient requires httpx")
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = LatencyStats()
+        connect, read = timeout
+        self.client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    def _delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+
+    async def request(self, method: str, path: str = "", **kwargs):
+        url = _join(self.base_url, path)
+        retry = method.upper() in Retry.DEFAULT_ALLOWED_METHODS
+        start = time.perf_counter()
+        error = True
+        try:
+            for attempt in range(self.retries + 1):
+                last = attempt == self.retries or not retry
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    if last:
+                        raise
+                    await asyncio.sleep(self._delay(attempt))
+                    continue
+                if response.status_code not in RETRY_STATUSES or last:
+                    error = response.status_code >= 400
+                    return response
+                await asyncio.sleep(self._delay(attempt, response))
+        finally:
+            self.stats.record(_endpoint(url), time.perf_counter() - start, error)
+
+    async def get(self, path: str = "", **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str = "", **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -8,6 +8,7 @@ from services.crud.user import create_user, get_user_by_id
 from services.crud.event import update_model_event
 from services.crud.model import get_model_by_params, init_model, add_model
 from services.crud.tank import init_tanks
+from ml.prediction import CandidateBlock
 
 if __name__ == '__main__':
     settings = get_settings()
@@ -33,5 +34,5 @@ if __name__ == '__main__':
             model = get_model_by_params(session)
             model = init_model(model)
             create_user(demo_common_user, session)
-            update_model_event(demo_model_event, session, model, general_df, premium_df)
+            update_model_event(demo_model_event, session, model, general_df, CandidateBlock(premium_df))
             create_user(demo_admin_user, session)
@@ -0,0 +1,145 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from loguru import logger
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def stats_fingerprint(user_df) -> str:
+    """
+    Hash of user's stats payload from get_user_data.
+
+    Args:
+        user_df: User's per-tank stats.
+
+    Returns:
+        str: Hex digest, equal for equal payloads
+    """
+    digest = hashlib.sha1(",".join(map(str, user_df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(user_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class SharedTier:
+    """
+    Result cache tier in Redis shared by API and worker replicas.
+
+    Attributes:
+        ttl (int): Entry lifetime in seconds
+    """
+
+    def __init__(self, url: str, ttl: int, prefix: str = "predict"):
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def _name(self, key) -> str:
+        return f"{self.prefix}:" + ":".join(map(str, key))
+
+    def get(self, key):
+        value = self._client.get(self._name(key))
+        return None if value is None else pickle.loads(value)
+
+    def put(self, key, value) -> None:
+        self._client.set(self._name(key), pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, key) -> None:
+        self._client.delete(self._name(key))
+
+
+class ResultCache:
+    """
+    Two-tier TTL cache of prediction results.
+
+    The local tier is an in-process LRU; the optional shared tier is looked up
+    on a local miss and its hits are promoted to the local tier. Shared tier
+    errors are logged and treated as misses, so Redis being down only costs a
+    re-score.
+
+    Attributes:
+        ttl (int): Entry lifetime in seconds
+        max_items (int): Capacity of the local tier
+        shared (SharedTier): Shared tier, None if disabled
+        hits (int): Lookups served from either tier
+        misses (int): Lookups that found nothing
+    """
+
+    def __init__(self, ttl: int = 600, max_items: int = 10000, shared_url: str | None = None):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self.shared = None
+        if shared_url:
+            if redis is None:
+                logger.warning("redis is not installed, shared result cache is disabled")
+            else:
+                self.shared = SharedTier(shared_url, ttl)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._items), "shared": self.shared is not None}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._items[key]
+
+        value = None
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"Shared result cache lookup failed: {e}")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._store(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, value)
+            except Exception as e:
+                logger.warning(f"Shared result cache update failed: {e}")
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"Shared result cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def _store(self, key, value) -> None:
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
@@ -1,57 +1,266 @@
-import joblib
+import hashlib
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 from helper.helper import get_user_data
+from ml.layout import LayoutPlan, ID_COLUMNS, PREMIUM_CAT_COLUMNS
+from ml.ranking import top_k
+from ml.cache import stats_fingerprint
 
-PREDICTION_COLUMNS = joblib.load("./ml/columns.joblib")
-MEANS = joblib.load("./ml/means.joblib")
-STDS = joblib.load("./ml/stds.joblib")
+LAYOUT = LayoutPlan.load("./ml")
+PREDICTION_COLUMNS = LAYOUT.columns
+MAX_BATCH_BYTES = 256 * 1024 ** 2
+# float32 признаки, отмасштабированные средними и std артефактов, получают их тип (float64)
+NUM_DTYPE = np.result_type(np.float32, LAYOUT.means, LAYOUT.stds)
 
 
 def scale_data(data, means, stds):
-    X_values = data.to_numpy(dtype=np.float32)
+    X_values = np.asarray(data, dtype=np.float32)
     X_values = (X_values - means) / stds
 
     return X_values
 
 
-def preprocessing(user_df, general_df, premium_df):
-    user_general_df = user_df[user_df.tank_id.isin(general_df.tank_id.values)]
-    user_general_df = user_general_df.query("(battles >= wins + losses) & (battles > 10) & (damage_dealt > 0)")
-    avg_cols = user_general_df.drop(["user_id", "tank_id", "max_xp", "battles", "max_frags", "mark_of_mastery"],
-                                    axis=1).columns
-    user_general_df[avg_cols] = user_general_df[avg_cols].div(user_general_df["battles"], axis=0).astype("float32")
-    already_has = user_df[user_df.tank_id.isin(premium_df.tank_id.values)].tank_id.values
-    predict_prem_df = premium_df[~premium_df.tank_id.isin(already_has)].query("tier >= 5")
-    predict_prem_df = predict_prem_df.drop(["name", "default_profile.signal_range"], axis=1)
+def user_vector(user_df, general_df):
+    """
+    Lay out user's averaged stats on general tanks as one row of PREDICTION_COLUMNS.
 
-    user_general_df = user_general_df.pivot(index="user_id", columns="tank_id")
-    user_general_df.columns = ["_".join([str(part) for part in col if part not in (None, "")]) for col in
-                               user_general_df.columns]
-    user_general_df.reset_index(inplace=True)
+    Args:
+        user_df: User's per-tank stats from get_user_data.
+        general_df: General (non-premium) tanks catalog.
 
-    prem_cols = (["tank_id"] + [col for col in predict_prem_df.columns if "default_profile" in col] + ["nation", "tier",
-                                                                                                       "type"])
-    predict_prem_df = predict_prem_df[prem_cols]
+    Returns:
+        tuple[np.ndarray, bool]: float32 vector (NaN for missing features) and
+            whether the user has at least one qualifying tank.
+    """
+    vector = np.full(len(PREDICTION_COLUMNS), np.nan, dtype=np.float32)
+    tank_ids = user_df["tank_id"].to_numpy()
+    battles = user_df["battles"].to_numpy()
+    keep = (np.isin(tank_ids, general_df["tank_id"].to_numpy())
+            & (battles >= user_df["wins"].to_numpy() + user_df["losses"].to_numpy())
+            & (battles > 10)
+            & (user_df["damage_dealt"].to_numpy() > 0))
+    if not keep.any():
+        return vector, False
 
-    X = user_general_df.merge(predict_prem_df, how="cross")
-    needed_columns = list(set(PREDICTION_COLUMNS).difference(set(X.columns)))
-    X = pd.concat([X, pd.DataFrame(columns=needed_columns)], axis=1)
-    X = X[["user_id", "tank_id"] + list(PREDICTION_COLUMNS)]
+    model_tank_ids = LAYOUT.user_tank_ids
+    pos = np.minimum(np.searchsorted(model_tank_ids, tank_ids[keep]), len(model_tank_ids) - 1)
+    known = model_tank_ids[pos] == tank_ids[keep]
 
-    cat_cols = [col for col in X.columns if "mark_of_mastery" in col] + ["nation", "tier", "type"]
-    num_cols = [col for col in X.columns if col not in ["user_id", "tank_id"] + cat_cols]
+    values = user_df[LAYOUT.user_stats].to_numpy(dtype=np.float64)[keep][known]
+    values[:, LAYOUT.user_avg_stats] /= battles[keep][known, None]
+    slots = LAYOUT.user_slot_matrix[pos[known]]
+    valid = slots >= 0
+    vector[slots[valid]] = values[valid].astype(np.float32)
 
-    X[num_cols] = scale_data(X[num_cols], MEANS, STDS)
-    X[cat_cols] = X[cat_cols].astype("category")
+    return vector, True
+
+
+@lru_cache(maxsize=256)
+def _category_dtype(values, dtype):
+    if not values:
+        return pd.CategoricalDtype(pd.Index([], dtype=object))
+    return pd.CategoricalDtype(pd.Index(values).astype(dtype))
+
+
+def _user_category(values, sizes, dtype):
+    missing = np.isnan(values)
+    present = np.unique(values[~missing])
+    codes = np.searchsorted(present, values).astype(np.int16)
+    codes[missing] = -1
+    return pd.Categorical.from_codes(np.repeat(codes, sizes), dtype=_category_dtype(tuple(present.tolist()), dtype))
+
+
+class CandidateBlock:
+    """
+    Premium candidates (tier >= 5) pre-scaled into the PREDICTION_COLUMNS layout.
+
+    Built once per tank catalog and never mutated afterwards: a catalog refresh
+    builds a new block and swaps the reference (TankSnapshot in the API,
+    refresh_catalog in the worker), so readers always see a consistent snapshot.
+
+    Attributes:
+        tank_ids (np.ndarray): Candidate tank IDs in catalog order
+        profile (np.ndarray): Scaled default_profile features, one row per candidate
+        codes (dict): Category codes of nation, tier and type per candidate
+        dtypes (dict): Categorical dtypes the codes refer to
+        version (str): Hash of the block contents, identifies the catalog in result cache keys
+    """
+
+    def __init__(self, premium_df):
+        premium_df = premium_df.query("tier >= 5")
+        self.tank_ids = premium_df["tank_id"].to_numpy(copy=True)
+        self.profile = scale_data(premium_df[LAYOUT.profile_columns], LAYOUT.profile_means, LAYOUT.profile_stds)
+        categorical = {col: pd.Categorical(premium_df[col]) for col in PREMIUM_CAT_COLUMNS}
+        self.codes = {col: values.codes for col, values in categorical.items()}
+        self.dtypes = {col: values.dtype for col, values in categorical.items()}
+        for array in [self.tank_ids, self.profile, *self.codes.values()]:
+            array.setflags(write=False)
+
+        digest = hashlib.sha1()
+        for array in [self.tank_ids, self.profile, *self.codes.values()]:
+            digest.update(array.tobytes())
+        for dtype in self.dtypes.values():
+            digest.update(repr(list(dtype.categories)).encode())
+        self.version = digest.hexdigest()
+
+    def __len__(self):
+        return len(self.tank_ids)
+
+    def mask(self, owned_tank_ids):
+        return ~np.isin(self.tank_ids, owned_tank_ids)
+
+    def categories(self, mask):
+        return {col: pd.Categorical.from_codes(codes[mask], dtype=self.dtypes[col]).remove_unused_categories()
+                for col, codes in self.codes.items()}
+
+
+def user_rows(user_df, general_df, candidates):
+    """
+    Compute user's feature vector and the candidates to score for them.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Feature vector and indices of candidates
+            in the block the user doesn't own yet.
+    """
+    vector, has_stats = user_vector(user_df, general_df)
+    if not has_stats:
+        return vector, np.empty(0, dtype=np.int64)
+    return vector, np.flatnonzero(candidates.mask(user_df["tank_id"].to_numpy()))
+
+
+def assemble(user_ids, vectors, rows, candidates, mastery_dtype=np.int64, with_ids=True):
+    """
+    Build the model input for several users at once.
+
+    The numeric features are written once into one preallocated array of
+    NUM_DTYPE in model order, which the frame wraps without copying; ID and
+    categorical columns are inserted at their final positions, so no
+    concatenation or reordering copies the matrix.
+
+    Args:
+        user_ids: User IDs, shape (n,).
+        vectors: Users' feature vectors from user_vector, shape (n, len(PREDICTION_COLUMNS)).
+        rows: Per user, indices of the candidates to score.
+        candidates: CandidateBlock of the current catalog.
+        mastery_dtype: dtype of mark_of_mastery in the user data.
+        with_ids: Include ID_COLUMNS.
+
+    Returns:
+        pd.DataFrame: ID_COLUMNS (if with_ids) + PREDICTION_COLUMNS, one row per (user, candidate)
+    """
+    sizes = np.array([len(indices) for indices in rows], dtype=np.int64)
+    rows = np.concatenate(rows) if len(rows) else np.empty(0, dtype=np.int64)
+
+    num_block = np.repeat(scale_data(vectors[:, LAYOUT.num_slots], LAYOUT.means, LAYOUT.stds), sizes, axis=0)
+    num_block[:, LAYOUT.profile_num_pos] = candidates.profile[rows]
+
+    categorical = candidates.categories(rows)
+    for slot in LAYOUT.mastery_slots:
+        categorical[PREDICTION_COLUMNS[slot]] = _user_category(vectors[:, slot], sizes, mastery_dtype)
+
+    X = pd.DataFrame(num_block, columns=LAYOUT.num_columns, copy=False)
+    offset = 0
+    if with_ids:
+        X.insert(0, "user_id", np.repeat(user_ids, sizes))
+        X.insert(1, "tank_id", candidates.tank_ids[rows])
+        offset = len(ID_COLUMNS)
+    # cat_slots возрастают: к моменту вставки все предыдущие колонки уже на своих местах
+    for slot, col in zip(LAYOUT.cat_slots, LAYOUT.cat_columns):
+        X.insert(offset + int(slot), col, categorical[col])
 
     return X
 
 
-def predict(model, user_id, general_df, premium_df):
-    user_data = get_user_data(user_id)
-    preprocessed_data = preprocessing(user_data, general_df, premium_df)
-    preprocessed_data["preds"] = model.predict(preprocessed_data[PREDICTION_COLUMNS]).round().astype(int)
-    res = preprocessed_data[["tank_id", "preds"]].sort_values("preds", ascending=False)
+def preprocessing(user_df, general_df, candidates):
+    if isinstance(candidates, pd.DataFrame):
+        candidates = CandidateBlock(candidates)
+    vector, rows = user_rows(user_df, general_df, candidates)
+
+    return assemble(user_df["user_id"].to_numpy()[:1], vector[None, :], [rows], candidates,
+                    user_df["mark_of_mastery"].dtype)
+
+
+def _score_chunk(model, chunk, candidates, k):
+    user_ids = np.array([user_id for user_id, _, _ in chunk], dtype=np.int64)
+    rows = [indices for _, _, indices in chunk]
+    sizes = [len(indices) for indices in rows]
+    X = assemble(user_ids, np.stack([vector for _, vector, _ in chunk]), rows, candidates, with_ids=False)
+
+    scores = np.full((len(chunk), len(candidates)), np.nan)
+    if len(X):
+        scores[np.repeat(np.arange(len(chunk)), sizes), np.concatenate(rows)] = model.predict(X).to_numpy()
+    top, values = top_k(scores, k, tie_break=candidates.tank_ids)
+
+    results = {}
+    for user_id, user_top, user_values in zip(user_ids.tolist(), top, values):
+        found = np.isfinite(user_values)
+        results[user_id] = pd.DataFrame({"tank_id": candidates.tank_ids[user_top[found]], "preds": user_values[found]})
+    return results
+
+
+def predict_many(model, user_ids, general_df, candidates, k=3, max_rows=None, max_bytes=MAX_BATCH_BYTES,
+                 user_data=None, cache=None, model_key=None):
+    """
+    Score premium candidates for many users with one model call per chunk.
+
+    Users are grouped in order into chunks whose assembled matrix fits into
+    max_rows rows and max_bytes bytes; a user exceeding the budget alone forms
+    a chunk of its own. Only one chunk is held in memory at a time.
+
+    Args:
+        model: Loaded TabularPredictor.
+        user_ids: Users to score.
+        general_df: General (non-premium) tanks catalog.
+        candidates: CandidateBlock of the current catalog.
+        k: Number of recommendations per user.
+        max_rows: Row budget of one model call, unlimited if None.
+        max_bytes: Memory budget of one assembled chunk.
+        user_data: Optional mapping user_id -> get_user_data frame; missing users are fetched.
+        cache: ResultCache of previous results. Users found there are neither
+            preprocessed nor scored.
+        model_key: Model identity in cache keys (Model.model_id or the model path).
+
+    Returns:
+        dict: user_id -> DataFrame with tank_id and raw float preds, best first
+    """
+    user_data = user_data or {}
+    # Матрица чанка строится один раз: признаки NUM_DTYPE, коды категорий (до int16) и ID
+    row_bytes = len(LAYOUT.num_slots) * NUM_DTYPE.itemsize + 2 * len(LAYOUT.cat_slots) + 16
+    budget = max(max_bytes // row_bytes, 1)
+    if max_rows:
+        budget = min(budget, max_rows)
+
+    results, keys, chunk, chunk_size = {}, {}, [], 0
+    for user_id in user_ids:
+        user_df = user_data.get(user_id)
+        if user_df is None:
+            user_df = get_user_data(user_id)
+        if cache is not None:
+            key = (user_id, model_key, candidates.version, k, stats_fingerprint(user_df))
+            cached = cache.get(key)
+            if cached is not None:
+                results[user_id] = cached
+                continue
+            keys[user_id] = key
+        if user_df.empty:
+            vector, rows = np.full(len(LAYOUT), np.nan, dtype=np.float32), np.empty(0, dtype=np.int64)
+        else:
+            vector, rows = user_rows(user_df, general_df, candidates)
+
+        if chunk and chunk_size + len(rows) > budget:
+            results.update(_score_chunk(model, chunk, candidates, k))
+            chunk, chunk_size = [], 0
+        chunk.append((user_id, vector, rows))
+        chunk_size += len(rows)
+    if chunk:
+        results.update(_score_chunk(model, chunk, candidates, k))
+
+    for user_id, key in keys.items():
+        cache.put(key, results[user_id])
+    return results
+
 
-    return res.head(3)
+def predict(model, user_id, general_df, candidates, k=3, cache=None, model_key=None, user_data=None):
+    return predict_many(model, [user_id], general_df, candidates, k=k, user_data=user_data, cache=cache,
+                        model_key=model_key)[user_id]
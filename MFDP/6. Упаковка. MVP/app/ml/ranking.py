@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def top_k(scores, k, tie_break=None):
+    """
+    Select the k best candidates by raw score without sorting all of them.
+
+    Works on a 1-D candidates array or on a 2-D users x candidates array in one
+    vectorized pass. NaN scores mark candidates that must not be recommended.
+    Equal scores are ordered by ascending tie_break, so the result doesn't
+    depend on the partitioning order.
+
+    Args:
+        scores: Raw model scores, shape (n,) or (users, n).
+        k: Number of candidates to keep.
+        tie_break: Secondary key, shape (n,) or the shape of scores. Candidate
+            position by default.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Indices and scores of the best candidates,
+            best first, shape (..., min(k, n)). Slots without a valid candidate
+            hold -inf scores.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    squeeze = scores.ndim == 1
+    scores = np.atleast_2d(scores)
+    n = scores.shape[1]
+    k = max(min(k, n), 0)
+    if tie_break is None:
+        tie_break = np.arange(n)
+    tie_break = np.broadcast_to(tie_break, scores.shape)
+    keys = np.where(np.isnan(scores), np.inf, -scores)
+
+    if 0 < k < n:
+        top = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        kth = np.take_along_axis(keys, top, axis=1).max(axis=1)
+        for row in np.flatnonzero((keys <= kth[:, None]).sum(axis=1) > k):
+            top[row] = np.lexsort((tie_break[row], keys[row]))[:k]
+    else:
+        top = np.tile(np.arange(k), (scores.shape[0], 1))
+
+    order = np.lexsort((np.take_along_axis(tie_break, top, axis=1), np.take_along_axis(keys, top, axis=1)), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    values = -np.take_along_axis(keys, top, axis=1)
+
+    if squeeze:
+        return top[0], values[0]
+    return top, values
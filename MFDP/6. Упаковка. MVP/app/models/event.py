@@ -1,12 +1,15 @@
 from datetime import datetime, timezone
 from typing import Optional, List, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, Integer, ForeignKey as SA_ForeignKey
+from sqlalchemy import Column, Index, Integer, ForeignKey as SA_ForeignKey
 
 if TYPE_CHECKING:
     from models.tank import Tank
     from models.user import User
 
+PREDICTION_PENDING = "pending"
+PREDICTION_DONE = "done"
+
 
 class Prediction(SQLModel, table=True):
     """
@@ -16,10 +19,17 @@ class Prediction(SQLModel, table=True):
         prediction_id (int): Уникальный идентификатор события
         creator_id (int): Уникальный ID игрока
         timestamp (datetime): Дата и время запроса
+        status (str): pending, пока кандидаты не записаны, затем done
     """
+    # Индексы под keyset-пагинацию истории по (timestamp, prediction_id), в том числе по одному игроку
+    __table_args__ = (
+        Index("ix_prediction_timestamp_id", "timestamp", "prediction_id"),
+        Index("ix_prediction_creator_timestamp_id", "creator_id", "timestamp", "prediction_id"),
+    )
     prediction_id: Optional[int] = Field(default=None, primary_key=True)
     creator_id: Optional[int] = Field(default=None, foreign_key="user.user_id")
     timestamp: Optional[datetime] = Field(default_factory=lambda: datetime.now(timezone.utc))
+    status: Optional[str] = Field(default=PREDICTION_PENDING)
     creator: Optional["User"] = Relationship(back_populates="model_events")
     candidates: List["PredictionCandidate"] = Relationship(back_populates="prediction", sa_relationship_kwargs={
         "cascade": "all, delete-orphan",
@@ -55,4 +65,4 @@ class PredictionCandidate(SQLModel, table=True):
     tank_id: Optional[int] = Field(foreign_key="tank.tank_id", index=True)
     predicted_damage: Optional[int] = Field(default=None)
     prediction: Optional[Prediction] = Relationship(back_populates="candidates")
-    tank: Optional['Tank'] = Relationship(back_populates="candidates", sa_relationship_kwargs={"lazy": "selectin"})
+    tank: Optional['Tank'] = Relationship(back_populates="candidates")
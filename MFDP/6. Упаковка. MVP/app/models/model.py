@@ -10,7 +10,13 @@ class Model(SQLModel, table=True):
         model_id (int): ID модели
         version (int): Версия модели
         path (str): Путь к модели
+        artifact_path (str): Путь к экспортированному для инференса артефакту (ml/export.py)
     """
     model_id: Optional[int] = Field(default=None, primary_key=True)
     version: Optional[int] = Field(default=1)
-    path: Optional[str] = Field(default="./ml/AutogluonModels/ag-20251205_150250")
\ No newline at end of file
+    path: Optional[str] = Field(default="./ml/AutogluonModels/ag-20251205_150250")
+    artifact_path: Optional[str] = Field(default=None)
+
+    @property
+    def serving_path(self) -> str:
+        return self.artifact_path or self.path
\ No newline at end of file
@@ -25,5 +25,4 @@ class Tank(SQLModel, table=True):
     type: Optional[str] = Field(default=None)
     is_premium: Optional[bool] = Field(default=None)
     image: Optional[str] = Field(default=None)
-    candidates: List['PredictionCandidate'] = Relationship(back_populates="tank",
-                                                           sa_relationship_kwargs={"lazy": "selectin"})
+    candidates: List['PredictionCandidate'] = Relationship(back_populates="tank")
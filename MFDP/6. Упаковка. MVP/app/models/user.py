@@ -18,8 +18,7 @@ class User(SQLModel, table=True):
     model_events: List['Prediction'] = Relationship(
         back_populates="creator",
         sa_relationship_kwargs={
-            "cascade": "all, delete-orphan",
-            "lazy": "selectin"
+            "cascade": "all, delete-orphan"
         }
     )
     is_admin: bool = Field(
@@ -1,11 +1,13 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 
 class ModelEventOut(BaseModel):
     prediction_id: int
     creator_id: int
     timestamp: datetime
+    status: Optional[str] = None
     candidates: list
 
 class UserOut(BaseModel):
@@ -16,12 +18,14 @@ class UserOut(BaseModel):
 class ModelIn(BaseModel):
     version: int
     path: str
+    artifact_path: Optional[str] = None
 
 
 class ModelOut(BaseModel):
     model_id: int
     version: int
     path: str
+    artifact_path: Optional[str] = None
 
 class Tank(BaseModel):
     tank_id: int
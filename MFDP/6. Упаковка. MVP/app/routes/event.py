@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Body, HTTPException, status, Depends, Request
-from database.database import get_session
+from fastapi import APIRouter, Body, HTTPException, status, Depends, Request, Response
+from database.database import get_session, get_async_session
 from models.event import Prediction
 from routes.api_models import ModelEventOut, UserOut
 from typing import List, Dict, Annotated
@@ -8,17 +8,25 @@ from services.crud import model as ModelService
 from services.rm.rm import send_task
 from loguru import logger
 from routes.user import get_current_active_user
+from routes.pagination import PageParams, events_page
+from services.startup.startup import require_ready
 import json
+import asyncio
+import contextvars
+from starlette.concurrency import run_in_threadpool
 
 event_route = APIRouter()
 
 
 @event_route.get("/retrieve_all_model_events", response_model=List[ModelEventOut])
 async def retrieve_all_model_events(current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                                    session=Depends(get_session)) -> List[ModelEventOut]:
+                                    request: Request, response: Response,
+                                    page: Annotated[PageParams, Depends()],
+                                    session=Depends(get_async_session)) -> List[ModelEventOut]:
     try:
-        events = EventService.get_all_model_events(current_user, session)
-        logger.info(f"Retrieved {len(events)} model events")
+        events = await events_page(current_user, session, page, request, response)
+        if not page.stream:
+            logger.info(f"Retrieved {len(events)} model events")
         return events
     except Exception as e:
         logger.error(f"Error retrieving model events: {str(e)}")
@@ -30,10 +38,10 @@ async def retrieve_all_model_events(current_user: Annotated[UserOut, Depends(get
 
 @event_route.get("/model_event/{model_event_id}", response_model=ModelEventOut)
 async def retrieve_model_event(model_event_id: int, current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                               session=Depends(get_session)) -> ModelEventOut:
+                               session=Depends(get_async_session)) -> ModelEventOut:
     try:
         if current_user.is_admin:
-            events = EventService.get_model_event_by_id(model_event_id, session)
+            events = await EventService.get_model_event_by_id_async(model_event_id, session)
             if events is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -62,23 +70,34 @@ async def retrieve_model_event(model_event_id: int, current_user: Annotated[User
                             detail="Balance event with supplied ID does not exist")
 
 
-@event_route.get("/new_model_event")
+@event_route.get("/new_model_event", dependencies=[Depends(require_ready)])
 async def create_model_event(current_user: Annotated[UserOut, Depends(get_current_active_user)],
                              request: Request,
-                             session=Depends(get_session)) -> Dict[str, str | list | None]:
-    model_event = EventService.create_model_event(Prediction(creator_id=current_user.user_id),
-                                                  session)
-    model = ModelService.get_model_by_params(session)
-    model = ModelService.init_model(model)
-    result = EventService.update_model_event(model_event, session, model, request.app.state.general_df,
-                                             request.app.state.premium_df)
+                             session=Depends(get_session),
+                             async_session=Depends(get_async_session)) -> Dict[str, str | list | None]:
+    state = request.app.state
+    model_event = await run_in_threadpool(EventService.create_model_event,
+                                          Prediction(creator_id=current_user.user_id), session)
+    model_record = await ModelService.get_model_by_params_async(async_session)
+
+    # Снимок каталога берётся один раз: general_df и кандидаты одной версии
+    catalog = state.tanks.get()
+
+    def run_prediction():
+        model = ModelService.init_model(model_record, state.models)
+        return EventService.update_model_event(model_event, session, model, catalog.general_df, catalog.candidates,
+                                               cache=state.results, model_key=model_record.model_id)
+
+    # Загрузка модели и инференс нагружают CPU: выполняем их в ограниченном пуле, не блокируя event loop
+    result = await asyncio.get_running_loop().run_in_executor(state.predict_executor,
+                                                              contextvars.copy_context().run, run_prediction)
     return {"message": "Model event created.", "candidates": result.get("candidates")}
 
 
 @event_route.get("/send_task")
-async def send_task_to_queue(current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                             session=Depends(get_session),
-                             model_path="./ml/AutogluonModels/ag-20251205_150250") -> Dict[str, str]:
+def send_task_to_queue(current_user: Annotated[UserOut, Depends(get_current_active_user)],
+                       session=Depends(get_session),
+                       model_path="./ml/AutogluonModels/ag-20251205_150250") -> Dict[str, str]:
     try:
         model_event = EventService.create_model_event(Prediction(creator_id=current_user.user_id),
                                                       session)
@@ -90,16 +109,16 @@ async def send_task_to_queue(current_user: Annotated[UserOut, Depends(get_curren
         raise HTTPException(status_code=500, detail=e)
 
 @event_route.post("/task_result")
-async def get_task_result(body: dict = Body(...), session=Depends(get_session), ):
-    EventService.update_task_model_event(body, session)
-    return {"Result": "Data received and updated."}
+def get_task_result(body: dict = Body(...), session=Depends(get_session), ):
+    _, missing = EventService.update_task_model_event(body, session)
+    return {"Result": "Data received and updated.", "missing": missing}
 
 
 
 
 @event_route.delete("/model_event/{model_event_id}")
-async def delete_model_event(current_user: Annotated[UserOut, Depends(get_current_active_user)], model_event_id: int,
-                             session=Depends(get_session)) -> Dict[str, str]:
+def delete_model_event(current_user: Annotated[UserOut, Depends(get_current_active_user)], model_event_id: int,
+                       session=Depends(get_session)) -> Dict[str, str]:
     try:
         if current_user.is_admin:
             EventService.delete_model_events_by_id(model_event_id, session)
@@ -120,8 +139,8 @@ async def delete_model_event(current_user: Annotated[UserOut, Depends(get_curren
 
 
 @event_route.delete("/")
-async def delete_all_events(current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                            session=Depends(get_session)) -> Dict[str, str]:
+def delete_all_events(current_user: Annotated[UserOut, Depends(get_current_active_user)],
+                      session=Depends(get_session)) -> Dict[str, str]:
     if current_user.is_admin:
         EventService.delete_all_events(session)
         return {"message": "Events deleted successfully"}
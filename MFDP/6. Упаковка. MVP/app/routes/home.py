@@ -1,5 +1,9 @@
 from typing import Dict
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from helper.helper import BLITZ_API
+from database.instrumentation import route_metrics
+from services.rm.rm import publisher
 
 home_route = APIRouter()
 
@@ -47,3 +51,78 @@ async def health_check() -> Dict[str, str]:
             status_code=503,
             detail="Service unavailable"
         )
+
+
+@home_route.get(
+    "/health/live",
+    response_model=Dict[str, str],
+    summary="Liveness probe",
+    description="Returns OK while the process serves requests"
+)
+async def liveness() -> Dict[str, str]:
+    return {"status": "alive"}
+
+
+@home_route.get(
+    "/health/ready",
+    summary="Readiness probe",
+    description="Returns per-component readiness and startup stage timings, 503 until all stages are ready"
+)
+async def readiness(request: Request) -> JSONResponse:
+    """
+    Readiness probe for the load balancer.
+
+    Returns:
+        JSONResponse: ready flag, the failed stage error (if any) and startup stages
+    """
+    startup = request.app.state.startup
+    ready = startup.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "error": startup.error(), "stages": startup.snapshot()}
+    )
+
+
+@home_route.get(
+    "/health/upstream",
+    summary="Upstream API latency",
+    description="Returns per-endpoint counters of Tanks Blitz API requests"
+)
+async def upstream_stats() -> dict:
+    """
+    Latency counters of the shared Tanks Blitz API client.
+
+    Returns:
+        dict: Endpoint -> count, errors, total_ms, max_ms, avg_ms
+    """
+    return BLITZ_API.stats.snapshot()
+
+
+@home_route.get(
+    "/health/db",
+    summary="Database queries per route",
+    description="Returns per-route counters of database queries, rows and time"
+)
+async def db_stats() -> dict:
+    """
+    Query counters collected by QueryStatsMiddleware.
+
+    Returns:
+        dict: "METHOD path" -> requests, queries, max_queries, avg_queries, rows, time_ms
+    """
+    return route_metrics.snapshot()
+
+
+@home_route.get(
+    "/health/queue",
+    summary="Task queue publisher",
+    description="Returns counters of ML task publishes to RabbitMQ"
+)
+async def queue_stats() -> dict:
+    """
+    Counters of the shared task publisher.
+
+    Returns:
+        dict: count, errors, reconnects, total_ms, max_ms, avg_ms
+    """
+    return publisher.stats.snapshot()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Body, HTTPException, status, Depends
+from fastapi import APIRouter, Body, HTTPException, status, Depends, Request
 from database.database import get_session
 from routes.api_models import ModelIn, ModelOut
 from typing import List
@@ -10,7 +10,7 @@ model_route = APIRouter()
 
 
 @model_route.get("/", summary="Get all models", response_model=List[ModelOut])
-async def retrieve_models(session=Depends(get_session)) -> List[ModelOut]:
+def retrieve_models(session=Depends(get_session)) -> List[ModelOut]:
     try:
         models = ModelService.get_all_models(session)
         logger.info(f"Retrieved {len(models)} models")
@@ -23,8 +23,13 @@ async def retrieve_models(session=Depends(get_session)) -> List[ModelOut]:
         )
 
 
+@model_route.get("/registry", summary="Get loaded models stats")
+async def retrieve_registry_stats(request: Request) -> dict:
+    return request.app.state.models.stats()
+
+
 @model_route.get("/id/{model_id}", summary="Get model by ID", response_model=ModelOut)
-async def retrieve_model_by_id(model_id: int, session=Depends(get_session)) -> ModelOut:
+def retrieve_model_by_id(model_id: int, session=Depends(get_session)) -> ModelOut:
     try:
         models = ModelService.get_model_by_id(model_id, session)
         if models is None:
@@ -47,8 +52,8 @@ async def retrieve_model_by_id(model_id: int, session=Depends(get_session)) -> M
 
 
 @model_route.get("/params", summary="Get model by params", response_model=ModelOut)
-async def retrieve_model_by_params(version: int = 1, path: str = "./ml/AutogluonModels/ag-20251205_150250",
-                                   session=Depends(get_session)) -> ModelOut:
+def retrieve_model_by_params(version: int = 1, path: str = "./ml/AutogluonModels/ag-20251205_150250",
+                             session=Depends(get_session)) -> ModelOut:
     try:
         model = ModelService.get_model_by_params(session, version, path)
         if model is None:
@@ -70,7 +75,7 @@ async def retrieve_model_by_params(version: int = 1, path: str = "./ml/Autogluon
         )
 
 @model_route.post("/new_model", summary="Add new model",)
-async def create_new_model(body: ModelIn = Body(...), session=Depends(get_session)) -> dict:
+def create_new_model(body: ModelIn = Body(...), session=Depends(get_session)) -> dict:
 
     if ModelService.get_model_by_params(session, body.version, body.path):
         logger.warning(f"Model with params:\n\tversion = {body.version}\n\tpath = {body.path}\nalready exists")
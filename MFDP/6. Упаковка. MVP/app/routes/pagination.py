@@ -0,0 +1,76 @@
+from typing import AsyncIterator, Optional
+from fastapi import HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from routes.api_models import ModelEventOut
+from services.crud import history as HistoryService
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PageParams:
+    """
+    Keyset pagination query parameters of the history endpoints.
+
+    Attributes:
+        limit (int): Page size; without it a page has DEFAULT_PAGE_SIZE events and a stream is unbounded.
+            Without a cursor the page holds the newest events
+        before (str): Cursor from X-Prev-Cursor, returns events right before it
+        after (str): Cursor from X-Next-Cursor, returns events right after it
+        stream (bool): Write events as NDJSON while they are read from the database
+    """
+
+    def __init__(self,
+                 limit: Optional[int] = Query(None, ge=1, description="Page size"),
+                 before: Optional[str] = Query(None, description="Return events before this cursor"),
+                 after: Optional[str] = Query(None, description="Return events after this cursor"),
+                 stream: bool = Query(False, description="Stream events as NDJSON")):
+        if before and after:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Use either before or after, not both")
+        for cursor in (before, after):
+            if cursor:
+                try:
+                    HistoryService.decode_cursor(cursor)
+                except ValueError:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        self.limit = limit
+        self.before = before
+        self.after = after
+        self.stream = stream
+
+    @property
+    def page_size(self) -> int:
+        return min(self.limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+
+async def events_page(user, session: AsyncSession, page: PageParams, request: Request, response: Response):
+    """
+    Answer a history request of the user with one page or an NDJSON stream of events.
+
+    The page is the response body; cursors of the neighbouring pages go to the
+    X-Next-Cursor / X-Prev-Cursor and Link headers.
+    """
+    if page.stream:
+        return StreamingResponse(_ndjson(user, session.bind, page), media_type="application/x-ndjson")
+
+    events, next_cursor, prev_cursor = await HistoryService.get_events_page_async(
+        session, user, page.page_size, page.before, page.after)
+    links = []
+    for rel, header, key, cursor in (("next", "X-Next-Cursor", "after", next_cursor),
+                                     ("prev", "X-Prev-Cursor", "before", prev_cursor)):
+        if cursor:
+            response.headers[header] = cursor
+            url = request.url.remove_query_params(["before", "after"]).include_query_params(**{key: cursor})
+            links.append(f'<{url}>; rel="{rel}"')
+    if links:
+        response.headers["Link"] = ", ".join(links)
+    return events
+
+
+async def _ndjson(user, bind, page: PageParams) -> AsyncIterator[bytes]:
+    # Отдельная сессия: сессия зависимости закрывается до того, как тело ответа будет отправлено
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        async for event in HistoryService.stream_events_async(session, user, page.limit, page.before, page.after):
+            yield ModelEventOut(**event).model_dump_json().encode() + b"\n"
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from database.database import get_session
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
+from database.database import get_async_session
 from routes.api_models import Tank, UserOut
 from typing import List
 from services.crud import tank as TankService
@@ -8,11 +8,32 @@ from routes.user import get_current_active_user
 
 tank_route = APIRouter()
 
+# Каталог меняется только при обновлении энциклопедии; клиенты перепроверяют его по ETag
+CACHE_CONTROL = "public, max-age=300"
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _cached_json(request: Request, payload: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
 
 @tank_route.get("/retrieve_all_tanks", response_model=List[Tank])
-async def retrieve_all_tanks(session=Depends(get_session)) -> List[Tank]:
+async def retrieve_all_tanks(request: Request, session=Depends(get_async_session)) -> List[Tank]:
+    snapshot = request.app.state.tanks.get()
+    if snapshot is not None:
+        return _cached_json(request, snapshot.payload, snapshot.etag)
     try:
-        tanks = TankService.get_all_tanks(session)
+        tanks = await TankService.get_all_tanks_async(session)
         logger.info(f"Retrieved {len(tanks)} tanks")
         return tanks
     except Exception as e:
@@ -24,9 +45,17 @@ async def retrieve_all_tanks(session=Depends(get_session)) -> List[Tank]:
 
 
 @tank_route.get("/tanks/{tank_id}", response_model=Tank)
-async def retrieve_tank(tank_id: int, session=Depends(get_session)) -> Tank:
+async def retrieve_tank(tank_id: int, request: Request, session=Depends(get_async_session)) -> Tank:
+    snapshot = request.app.state.tanks.get()
+    if snapshot is not None:
+        if tank_id not in snapshot.tanks:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tank with ID {tank_id} not found"
+            )
+        return _cached_json(request, *snapshot.tanks[tank_id])
     try:
-        tanks = TankService.get_tank_by_id(tank_id, session)
+        tanks = await TankService.get_tank_by_id_async(tank_id, session)
         if tanks is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Response, Cookie, Request, Query
-from database.database import get_session
+from database.database import get_session, get_async_session
 from models.user import User
 from routes.api_models import ModelEventOut, UserOut, Token
+from routes.pagination import PageParams, events_page
 from services.crud import user as UserService
 from typing import List, Dict, Union, Annotated, Optional
 from loguru import logger
@@ -47,8 +48,9 @@ def is_request_from_swagger(request: Request) -> bool:
     return False
 
 
-async def get_current_user(token: Annotated[str | None, Cookie(alias="access_token")] = None,
-                           session=Depends(get_session)):
+async def get_current_user(request: Request,
+                           token: Annotated[str | None, Cookie(alias="access_token")] = None,
+                           session=Depends(get_async_session)) -> UserOut:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -58,12 +60,19 @@ async def get_current_user(token: Annotated[str | None, Cookie(alias="access_tok
         user_id = int(token)
         if user_id is None:
             raise credentials_exception
-    except InvalidTokenError:
+    except (InvalidTokenError, TypeError, ValueError):
         raise credentials_exception
-    user = UserService.get_user_by_id(user_id, session)
-    if user is None:
-        raise credentials_exception
-    return user
+
+    # Права пользователя кэшируются по токену; grant/revoke сбрасывают запись
+    principals = request.app.state.principals
+    principal = principals.get(user_id)
+    if principal is None:
+        user = await UserService.get_user_by_id_async(user_id, session)
+        if user is None:
+            raise credentials_exception
+        principal = UserOut(user_id=user.user_id, is_admin=user.is_admin)
+        principals.put(user_id, principal)
+    return principal
 
 
 async def get_current_active_user(
@@ -105,14 +114,14 @@ async def signin(request: Request, response: Response):
     return resp
 
 @user_route.get("/callback")
-async def auth_callback(request: Request,
-                        auth_status: Optional[str] = Query(None, alias="status"),
-                        access_token: Optional[str] = None,
-                        expires_at: Optional[str] = None,
-                        account_id: Optional[str] = None,
-                        nickname: Optional[str] = None,
-                        state: Optional[str] = None,
-                        session=Depends(get_session)):
+def auth_callback(request: Request,
+                  auth_status: Optional[str] = Query(None, alias="status"),
+                  access_token: Optional[str] = None,
+                  expires_at: Optional[str] = None,
+                  account_id: Optional[str] = None,
+                  nickname: Optional[str] = None,
+                  state: Optional[str] = None,
+                  session=Depends(get_session)):
     """
     Callback endpoint that provider redirects to.
     Provider returns auth_status, access_token, expires_at, account_id, nickname, and state.
@@ -167,8 +176,8 @@ async def auth_callback(request: Request,
     summary="Get all users",
     response_description="List of all users"
 )
-async def get_all_users(current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                        session=Depends(get_session)) -> List[UserOut]:
+def get_all_users(current_user: Annotated[UserOut, Depends(get_current_active_user)],
+                  session=Depends(get_session)) -> List[UserOut]:
     """
     Get list of all users.
 
@@ -209,20 +218,25 @@ async def get_all_users(current_user: Annotated[UserOut, Depends(get_current_act
     response_description="List of all user's events"
 )
 async def get_user_history(current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                           session=Depends(get_session)) -> List[Union[ModelEventOut]]:
+                           request: Request, response: Response,
+                           page: Annotated[PageParams, Depends()],
+                           session=Depends(get_async_session)) -> List[Union[ModelEventOut]]:
     """
-    Get list of all user's events.
+    Get a page of user's events, oldest first.
 
     Args:
-        data: User data
+        current_user: Authenticated user
+        page: limit, before/after cursors and NDJSON stream mode
         session: Database session
 
     Returns:
-        List[UserResponse]: List of user's events
+        List[ModelEventOut]: Page of user's events; cursors of the neighbouring pages are in the
+            X-Next-Cursor / X-Prev-Cursor and Link headers
     """
     try:
-        events = UserService.get_user_history(current_user, session)
-        logger.info(f"Retrieved {len(events)} history events.")
+        events = await events_page(current_user, session, page, request, response)
+        if not page.stream:
+            logger.info(f"Retrieved {len(events)} history events.")
         return events
     except Exception as e:
         logger.error(f"Error retrieving user's history: {str(e)}")
@@ -245,7 +259,7 @@ async def signout(response: Response):
     response_description="Current user info"
 )
 async def get_me(current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                 session=Depends(get_session)) -> UserOut:
+                 session=Depends(get_async_session)) -> UserOut:
     """
     Get list of all users.
 
@@ -256,7 +270,7 @@ async def get_me(current_user: Annotated[UserOut, Depends(get_current_active_use
         List[UserResponse]: List of users
     """
     try:
-        user = UserService.get_user_by_id(current_user.user_id, session)
+        user = await UserService.get_user_by_id_async(current_user.user_id, session)
         logger.info(f"User retrieved")
         return user
     except Exception as e:
@@ -272,9 +286,10 @@ async def get_me(current_user: Annotated[UserOut, Depends(get_current_active_use
     response_model=Dict,
     summary="Grant Admin status to user",
 )
-async def grant_admin(user_id: int,
-                      current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                      session=Depends(get_session)) -> Dict[str, str]:
+def grant_admin(user_id: int,
+                current_user: Annotated[UserOut, Depends(get_current_active_user)],
+                request: Request,
+                session=Depends(get_session)) -> Dict[str, str]:
     """
     Grant Admin status to user.
 
@@ -286,7 +301,7 @@ async def grant_admin(user_id: int,
     """
     try:
         if current_user.is_admin:
-            users = UserService.grant_admin_status(user_id, session)
+            users = UserService.grant_admin_status(user_id, session, request.app.state.principals)
             logger.info(f"User {current_user.user_id} grant admin status to user with ID {user_id}.")
             return users
         else:
@@ -313,9 +328,10 @@ async def grant_admin(user_id: int,
     response_model=Dict,
     summary="Revoke Admin status to user",
 )
-async def revoke_admin(user_id: int,
-                       current_user: Annotated[UserOut, Depends(get_current_active_user)],
-                       session=Depends(get_session)) -> Dict[str, str]:
+def revoke_admin(user_id: int,
+                 current_user: Annotated[UserOut, Depends(get_current_active_user)],
+                 request: Request,
+                 session=Depends(get_session)) -> Dict[str, str]:
     """
     Revoke Admin status to user.
 
@@ -327,7 +343,7 @@ async def revoke_admin(user_id: int,
     """
     try:
         if current_user.is_admin:
-            users = UserService.revoke_admin_status(user_id, session)
+            users = UserService.revoke_admin_status(user_id, session, request.app.state.principals)
             logger.info(f"User {current_user.user_id} revoke admin status from user with ID {user_id}.")
             return users
         else:
@@ -1,106 +1,99 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from models.model import Model
-from models.event import Prediction, PredictionCandidate
+from models.event import Prediction, PredictionCandidate, PREDICTION_DONE
 from ml.prediction import predict
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from services.crud.history import get_events, get_events_async
+from sqlalchemy import insert, select, update
 from loguru import logger
 
 
-def get_all_model_events(user, session) -> List[Prediction]:
-    stmt = select(Prediction)
-    if not user.is_admin:
-        stmt = stmt.where(Prediction.creator_id == user.user_id)
-
-    stmt = stmt.options(
-        selectinload(Prediction.candidates).selectinload(PredictionCandidate.tank)
-    ).order_by(Prediction.timestamp)
-
-    results = session.exec(stmt).scalars().all()
-
-    out = []
-    for el in results:
-        out.append({
-            "prediction_id": el.prediction_id,
-            "creator_id": el.creator_id,
-            "timestamp": el.timestamp,
-            "candidates": [
-                {
-                    "rank": c.rank,
-                    "tank_id": c.tank_id,
-                    "predicted_damage": c.predicted_damage,
-                    "tank_name": c.tank.name if c.tank else None,
-                    "tank_tier": c.tank.tier if c.tank else None,
-                    "tank_nation": c.tank.nation if c.tank else None,
-                    "tank_type": c.tank.type if c.tank else None,
-                    "tank_image": c.tank.image if c.tank else None,
-                }
-                for c in sorted(el.candidates, key=lambda x: x.rank)
-            ]
-        })
-    return out
-
-
-def get_model_event_by_id(id: int, session) -> Optional[Prediction]:
-    stmt = select(Prediction).where(Prediction.prediction_id == id)
-    stmt = stmt.options(
-        selectinload(Prediction.candidates).selectinload(PredictionCandidate.tank)
-    ).order_by(Prediction.timestamp)
-
-    results = session.exec(stmt).scalars().one_or_none()
-    if results:
-        out = {
-                "prediction_id": results.prediction_id,
-                "creator_id": results.creator_id,
-                "timestamp": results.timestamp,
-                "candidates": [
-                    {
-                        "rank": c.rank,
-                        "tank_id": c.tank_id,
-                        "predicted_damage": c.predicted_damage,
-                        "tank_name": c.tank.name if c.tank else None,
-                        "tank_tier": c.tank.tier if c.tank else None,
-                        "tank_nation": c.tank.nation if c.tank else None,
-                        "tank_type": c.tank.type if c.tank else None,
-                        "tank_image": c.tank.image if c.tank else None,
-                    }
-                    for c in sorted(results.candidates, key=lambda x: x.rank)
-                ]
-            }
-        return out
-    return None
-
-
-def update_model_event(event: Prediction, session, model, general_df, premium_df) -> Prediction:
-    res = predict(model, event.creator_id, general_df, premium_df)
-    for enum, el in enumerate(res.itertuples()):
-        event_candidates = PredictionCandidate()
-        event_data = {
-            "prediction_id": event.prediction_id,
-            "rank": enum + 1,
-            "tank_id": el.tank_id,
-            "predicted_damage": el.preds
-        }
-        for key, value in event_data.items():
-            setattr(event_candidates, key, value)
-
-        session.add(event_candidates)
-        session.commit()
-        session.refresh(event_candidates)
+def get_all_model_events(user, session) -> List[dict]:
+    return get_events(session, user)
+
+
+def get_model_event_by_id(id: int, session) -> Optional[dict]:
+    events = get_events(session, prediction_id=id)
+    return events[0] if events else None
+
+
+async def get_all_model_events_async(user, session) -> List[dict]:
+    return await get_events_async(session, user)
+
+
+async def get_model_event_by_id_async(id: int, session) -> Optional[dict]:
+    events = await get_events_async(session, prediction_id=id)
+    return events[0] if events else None
+
+
+def candidate_rows(prediction_id: int, res) -> List[dict]:
+    return [{"prediction_id": prediction_id, "rank": enum + 1, "tank_id": el.tank_id,
+             "predicted_damage": round(el.preds)} for enum, el in enumerate(res.itertuples())]
+
+
+def save_candidates(rows: List[dict], session, prediction_ids: Iterable[int] = ()) -> Tuple[int, List[int]]:
+    """
+    Write candidates of one or many predictions in one transaction.
+
+    The status transition is the gate: one UPDATE ... RETURNING marks the
+    predictions done, and candidates are inserted only for the IDs it
+    returned, in the same transaction. A concurrent or redelivered result for
+    a prediction that is already done gets no rows back, so candidates are
+    never duplicated. Predictions that no longer exist (deleted by an admin)
+    are skipped and reported, so they do not fail the whole batch.
+
+    Args:
+        rows: PredictionCandidate fields
+        session: Database session
+        prediction_ids: Predictions of the batch, also those with no candidates
+
+    Returns:
+        tuple: Number of written candidates, IDs of missing predictions
+    """
+    ids = set(prediction_ids) | {row["prediction_id"] for row in rows}
+    ids.discard(None)
+    if not ids:
+        return 0, []
+    # Строки prediction блокируются до commit: параллельный UPDATE дождётся его и не вернёт эти ID
+    claimed = set(session.execute(
+        update(Prediction).where(Prediction.prediction_id.in_(ids), Prediction.status != PREDICTION_DONE)
+        .values(status=PREDICTION_DONE).returning(Prediction.prediction_id)
+        .execution_options(synchronize_session=False)).scalars())
+    missing = []
+    if ids - claimed:
+        existing = set(session.execute(select(Prediction.prediction_id)
+                                       .where(Prediction.prediction_id.in_(ids - claimed))).scalars())
+        missing = sorted(ids - claimed - existing)
+    if missing:
+        logger.warning(f"Skipping results of missing predictions {missing}")
+    rows = [row for row in rows if row["prediction_id"] in claimed]
+    if rows:
+        session.execute(insert(PredictionCandidate.__table__), params=rows)
+    session.commit()
+    return len(rows), missing
+
+
+def update_model_event(event: Prediction, session, model, general_df, candidates, cache=None,
+                       model_key=None) -> Prediction:
+    res = predict(model, event.creator_id, general_df, candidates, cache=cache, model_key=model_key)
+    save_candidates(candidate_rows(event.prediction_id, res), session, [event.prediction_id])
     return get_model_event_by_id(event.prediction_id, session)
 
 
-def update_task_model_event(data: dict, session):
-    for el in data.get("result"):
-        event_candidates = PredictionCandidate()
-        for key, value in el.items():
-            setattr(event_candidates, key, value)
+def update_task_model_event(data: dict, session) -> Tuple[int, List[int]]:
+    """
+    Save task results sent by the worker.
 
-        session.add(event_candidates)
-        session.commit()
-        session.refresh(event_candidates)
+    Args:
+        data: One task, {"prediction_id": ..., "result": [candidate, ...]}, or a batch of tasks,
+            {"results": [{"prediction_id": ..., "result": [...]}, ...]}
+        session: Database session
 
-    return None
+    Returns:
+        tuple: Number of written candidates, IDs of missing predictions
+    """
+    tasks = data.get("results") or [data]
+    return save_candidates([row for task in tasks for row in task.get("result") or []], session,
+                           [task.get("prediction_id") for task in tasks])
 
 
 def create_model_event(new_event: Prediction, session) -> None:
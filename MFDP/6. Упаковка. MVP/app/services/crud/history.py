@@ -0,0 +1,179 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from models.event import Prediction, PredictionCandidate
+from models.tank import Tank
+
+EVENT_COLUMNS = ["prediction_id", "creator_id", "timestamp", "status"]
+CANDIDATE_COLUMNS = ["rank", "tank_id", "predicted_damage", "tank_name", "tank_tier", "tank_nation", "tank_type",
+                     "tank_image"]
+
+
+def encode_cursor(timestamp: datetime, prediction_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat(), prediction_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, prediction_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(timestamp), int(prediction_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def history_stmt(user=None, prediction_id: Optional[int] = None, limit: Optional[int] = None,
+                 before: Optional[str] = None, after: Optional[str] = None, latest: bool = False):
+    """
+    One statement reading events with their candidates and tanks.
+
+    The selected events (filter, keyset page and limit) are a CTE, joined
+    with candidates and tanks. Only the output columns are selected, one row
+    per candidate, ordered by event and rank, so group_events folds them
+    into events without ORM objects.
+
+    Args:
+        user: Requestor; non-admins see their own events only
+        prediction_id: Single event
+        limit: Number of events
+        before: Cursor; events right before it, newest first
+        after: Cursor; events right after it
+        latest: Without a cursor, take the newest events, newest first
+
+    Returns:
+        Select: Statement of EVENT_COLUMNS + CANDIDATE_COLUMNS rows
+    """
+    events = select(*[getattr(Prediction, col) for col in EVENT_COLUMNS])
+    if user is not None and not user.is_admin:
+        events = events.where(Prediction.creator_id == user.user_id)
+    if prediction_id is not None:
+        events = events.where(Prediction.prediction_id == prediction_id)
+
+    key = tuple_(Prediction.timestamp, Prediction.prediction_id)
+    if before:
+        events = events.where(key < decode_cursor(before))
+    elif after:
+        events = events.where(key > decode_cursor(after))
+    descending = bool(before) or (latest and not after)
+    order = [Prediction.timestamp.desc(), Prediction.prediction_id.desc()] if descending else \
+        [Prediction.timestamp, Prediction.prediction_id]
+    events = events.order_by(*order).limit(limit).cte("events")
+
+    order = [events.c.timestamp.desc(), events.c.prediction_id.desc()] if descending else \
+        [events.c.timestamp, events.c.prediction_id]
+    return (
+        select(
+            *[events.c[col] for col in EVENT_COLUMNS],
+            PredictionCandidate.rank,
+            PredictionCandidate.tank_id,
+            PredictionCandidate.predicted_damage,
+            Tank.name.label("tank_name"),
+            Tank.tier.label("tank_tier"),
+            Tank.nation.label("tank_nation"),
+            Tank.type.label("tank_type"),
+            Tank.image.label("tank_image"),
+        )
+        .select_from(events)
+        .outerjoin(PredictionCandidate, PredictionCandidate.prediction_id == events.c.prediction_id)
+        .outerjoin(Tank, Tank.tank_id == PredictionCandidate.tank_id)
+        .order_by(*order, PredictionCandidate.rank)
+    )
+
+
+class _EventFolder:
+    """Folds consecutive rows of one event into a ModelEventOut dict."""
+
+    def __init__(self):
+        self.event = None
+
+    def add(self, row) -> Optional[dict]:
+        """Add a row; returns the previous event once a row of the next one arrives."""
+        done = None
+        if self.event is None or self.event["prediction_id"] != row.prediction_id:
+            done = self.event
+            self.event = {col: getattr(row, col) for col in EVENT_COLUMNS}
+            self.event["candidates"] = []
+        if row.rank is not None:
+            self.event["candidates"].append({col: getattr(row, col) for col in CANDIDATE_COLUMNS})
+        return done
+
+    def finish(self) -> Optional[dict]:
+        done, self.event = self.event, None
+        return done
+
+
+def group_events(rows: Iterable) -> Iterator[dict]:
+    folder = _EventFolder()
+    for row in rows:
+        event = folder.add(row)
+        if event is not None:
+            yield event
+    event = folder.finish()
+    if event is not None:
+        yield event
+
+
+def get_events(session, user=None, prediction_id: Optional[int] = None) -> List[dict]:
+    return list(group_events(session.execute(history_stmt(user, prediction_id))))
+
+
+async def get_events_async(session, user=None, prediction_id: Optional[int] = None) -> List[dict]:
+    return list(group_events(await session.execute(history_stmt(user, prediction_id))))
+
+
+async def get_events_page_async(session, user, limit: int, before: Optional[str] = None,
+                                after: Optional[str] = None) -> Tuple[list, Optional[str], Optional[str]]:
+    """
+    Read one page of events in ascending (timestamp, prediction_id) order.
+
+    Without a cursor the page holds the newest events; older pages are
+    reached through the previous page cursor.
+
+    Args:
+        session: Async database session
+        user: Requestor
+        limit: Page size
+        before: Cursor; the page ends right before it
+        after: Cursor; the page starts right after it
+
+    Returns:
+        tuple: Events, cursor for the next page (after=), cursor for the previous page (before=)
+    """
+    events = list(group_events(await session.execute(
+        history_stmt(user, None, limit + 1, before, after, latest=True))))
+    more = len(events) > limit
+    events = events[:limit]
+    if not after:
+        events.reverse()
+    if not events:
+        return [], None, None
+    first, last = events[0], events[-1]
+    # После курсора after есть ещё более новые, если more; перед курсором before они есть всегда
+    next_cursor = encode_cursor(last["timestamp"], last["prediction_id"]) if (more if after else before) else None
+    prev_cursor = encode_cursor(first["timestamp"], first["prediction_id"]) if after or more else None
+    return events, next_cursor, prev_cursor
+
+
+async def stream_events_async(session, user, limit: Optional[int] = None, before: Optional[str] = None,
+                              after: Optional[str] = None, batch_size: int = 500) -> AsyncIterator[dict]:
+    """
+    Yield events as their rows are read from a server-side cursor, batch_size rows at a time.
+
+    Rows after a cursor come in ascending order, rows before a cursor in descending order.
+    """
+    result = await session.stream(history_stmt(user, None, limit, before, after)
+                                  .execution_options(yield_per=batch_size))
+    folder = _EventFolder()
+    async for row in result:
+        event = folder.add(row)
+        if event is not None:
+            yield event
+    event = folder.finish()
+    if event is not None:
+        yield event
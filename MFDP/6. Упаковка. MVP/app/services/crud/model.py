@@ -1,6 +1,8 @@
 from models.model import Model
 from typing import List, Optional
+from sqlalchemy import select
 from autogluon.tabular import TabularPredictor
+from ml.registry import PredictorRegistry
 
 
 def get_all_models(session) -> List[Model]:
@@ -37,5 +39,27 @@ def get_model_by_params(
     return None
 
 
-def init_model(model: Model):
-    return TabularPredictor.load(model.path)
+async def get_model_by_params_async(
+        session,
+        version: int = 1,
+        path: str = "./ml/AutogluonModels/ag-20251205_150250"
+) -> Optional[Model]:
+    stmt = select(Model).where(Model.version == version, Model.path == path)
+    return (await session.execute(stmt)).scalars().first()
+
+
+def init_model(model: Model, registry: Optional[PredictorRegistry] = None):
+    """
+    Load model's predictor.
+
+    Args:
+        model: Model record.
+        registry: Registry of loaded predictors. The predictor is loaded from disk
+            on every call if None.
+
+    Returns:
+        TabularPredictor: Loaded predictor
+    """
+    if registry is None:
+        return TabularPredictor.load(model.serving_path)
+    return registry.get(model.serving_path, key=model.model_id)
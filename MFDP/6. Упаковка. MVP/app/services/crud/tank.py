@@ -1,6 +1,15 @@
 from models.tank import Tank
-from helper.helper import get_tanks_data
+from helper.catalog import CATALOG_PATH, Catalog, current_version, load_catalog
+from ml.prediction import CandidateBlock
 from typing import List, Optional
+import hashlib
+import json
+import math
+import threading
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session
 
 def get_all_tanks(session) -> List[Tank]:
     return session.query(Tank).all()
@@ -12,14 +21,163 @@ def get_tank_by_id(id: int, session) -> Optional[Tank]:
         return tanks
     return None
 
-def init_tanks(session):
-    general_df, premium_df, db_tanks_df = get_tanks_data()
-    for el in db_tanks_df.to_dict(orient="records"):
-        tank = Tank()
-        for key, value in el.items():
-            setattr(tank, key, value)
 
-        session.add(tank)
+async def get_all_tanks_async(session) -> List[Tank]:
+    return (await session.execute(select(Tank))).scalars().all()
+
+
+async def get_tank_by_id_async(id: int, session) -> Optional[Tank]:
+    return await session.get(Tank, id)
+
+
+def _tank_rows(tanks_df) -> List[dict]:
+    columns = [column.name for column in Tank.__table__.columns]
+    rows = []
+    for record in tanks_df[columns].to_dict(orient="records"):
+        row = {}
+        for key, value in record.items():
+            value = value.item() if hasattr(value, "item") else value
+            row[key] = None if isinstance(value, float) and math.isnan(value) else value
+        rows.append(row)
+    return rows
+
+
+def sync_tanks(session, tanks_df) -> dict:
+    """
+    Upsert the tank catalog with one INSERT ... ON CONFLICT statement.
+
+    Current rows are read first, so only new and changed tanks are written.
+
+    Args:
+        session: Database session
+        tanks_df: Rows of the tanks table, as load_catalog returns them
+
+    Returns:
+        dict: Number of inserted, updated and unchanged tanks
+    """
+    table = Tank.__table__
+    existing = {row.tank_id: dict(row._mapping) for row in session.execute(select(table))}
+    rows = _tank_rows(tanks_df)
+    changed = [row for row in rows if existing.get(row["tank_id"]) != row]
+    counts = {"inserted": sum(row["tank_id"] not in existing for row in changed)}
+    counts["updated"] = len(changed) - counts["inserted"]
+    counts["unchanged"] = len(rows) - len(changed)
+
+    if changed:
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(table).values(changed)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.tank_id],
+            set_={column.name: stmt.excluded[column.name] for column in table.columns if not column.primary_key},
+        )
+        session.execute(stmt)
         session.commit()
-        session.refresh(tank)
-    return general_df, premium_df
\ No newline at end of file
+    logger.info(f"Tank catalog synced: {counts}")
+    return counts
+
+
+def init_tanks(session):
+    general_df, premium_df, db_tanks_df = load_catalog()
+    sync_tanks(session, db_tanks_df)
+    return general_df, premium_df
+
+
+def _etag(payload: bytes) -> str:
+    return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+class TankSnapshot:
+    """
+    Immutable tank catalog of one catalog version.
+
+    Holds everything derived from the catalog, so a refresh swaps the
+    serialized tanks and the prediction inputs together and a request that
+    took the snapshot once sees one version throughout.
+
+    Attributes:
+        version (str): Catalog version
+        payload (bytes): JSON list of all tanks
+        etag (str): Strong ETag of payload
+        tanks (dict): tank_id -> (JSON of the tank, its ETag)
+        general_df (pd.DataFrame): General tanks
+        candidates (CandidateBlock): Premium candidates, None if the catalog has no premium table
+    """
+
+    def __init__(self, catalog: Catalog):
+        self.version = catalog.version
+        rows = _tank_rows(catalog.tanks_df)
+        self.payload = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode()
+        self.etag = _etag(self.payload)
+        self.tanks = {}
+        for row in rows:
+            payload = json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode()
+            self.tanks[row["tank_id"]] = (payload, _etag(payload))
+        self.general_df = catalog.general_df
+        self.candidates = CandidateBlock(catalog.premium_df) if catalog.premium_df is not None else None
+
+
+class TankCatalogCache:
+    """
+    Current TankSnapshot; follows new catalog versions written by `python -m helper.catalog refresh`.
+
+    A background thread checks the CURRENT version every check_interval
+    seconds. A new version is synced into the tanks table and serialized
+    off the request path, then swapped in by one reference assignment;
+    get() never does I/O.
+
+    Attributes:
+        root (str): Snapshot directory
+        check_interval (float): Seconds between checks of the current catalog version
+        engine: Engine of the tanks table; the table is not synced if None
+    """
+
+    def __init__(self, root: str = CATALOG_PATH, check_interval: float = 30, engine=None):
+        self.root = root
+        self.check_interval = check_interval
+        self.engine = engine
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self, catalog: Catalog) -> TankSnapshot:
+        """Sync the tanks table with the catalog, then make it the current snapshot."""
+        with self._lock:
+            if self.engine is not None:
+                with Session(self.engine) as session:
+                    sync_tanks(session, catalog.tanks_df)
+            snapshot = TankSnapshot(catalog)
+            self.snapshot = snapshot
+        logger.info(f"Tank catalog snapshot {snapshot.version}: {len(snapshot.tanks)} tanks")
+        return snapshot
+
+    def get(self) -> Optional[TankSnapshot]:
+        """Current snapshot, None until the catalog is loaded."""
+        return self.snapshot
+
+    def refresh(self) -> Optional[TankSnapshot]:
+        """Load the current catalog version if it differs from the snapshot."""
+        version = current_version(self.root)
+        snapshot = self.snapshot
+        if version is not None and (snapshot is None or version != snapshot.version):
+            snapshot = self.load(load_catalog(self.root, bootstrap=False))
+        return snapshot
+
+    def start(self) -> None:
+        """Start following the catalog in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="tank-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Tank catalog refresh failed: {e}")
@@ -1,10 +1,25 @@
+import asyncio
 import pika
 import os
+import threading
+import time
+from loguru import logger
+
+try:
+    import aio_pika
+except ImportError:
+    aio_pika = None
 
 RABBIT_HOST = os.getenv("RABBIT_HOST")
 RABBIT_PORT = os.getenv("RABBIT_PORT")
 PIKA_USERNAME = os.getenv("RABBITMQ_DEFAULT_USER")
 PIKA_PASSWORD = os.getenv("RABBITMQ_DEFAULT_PASS")
+# Подтверждения брокера (publisher confirms): publish возвращается, когда сообщение принято очередью
+PUBLISH_CONFIRMS = os.getenv("RABBIT_PUBLISH_CONFIRMS", "false").lower() in ("1", "true", "yes")
+HEARTBEAT = 30
+
+# Имя очереди
+QUEUE_NAME = 'ml_task_queue'
 
 # Параметры подключения
 connection_params = pika.ConnectionParameters(
@@ -15,25 +30,219 @@ connection_params = pika.ConnectionParameters(
         username=PIKA_USERNAME,  # Имя пользователя по умолчанию
         password=PIKA_PASSWORD   # Пароль по умолчанию
     ),
-    heartbeat=30,
+    heartbeat=HEARTBEAT,
     blocked_connection_timeout=2
 )
 
-def send_task(message:str):
-    connection = pika.BlockingConnection(connection_params)
-    channel = connection.channel()
 
-    # Имя очереди
-    queue_name = 'ml_task_queue'
+class PublishStats:
+    """
+    Publish counters.
+
+    Attributes:
+        count (int): Published messages
+        errors (int): Messages of failed publishes
+        calls (int): Publish calls, failed ones included
+        reconnects (int): Connections opened after the first one
+        total_ms (float): Time spent publishing, connection setup and failed calls included
+        max_ms (float): Slowest publish
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.calls = 0
+        self.reconnects = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed: float, error: bool, messages: int = 1) -> None:
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self.count += 0 if error else messages
+            self.errors += messages if error else 0
+            self.calls += 1
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"count": self.count, "errors": self.errors, "calls": self.calls, "reconnects": self.reconnects,
+                    "total_ms": self.total_ms, "max_ms": self.max_ms,
+                    "avg_ms": self.total_ms / self.calls if self.calls else 0.0}
+
+
+class TaskPublisher:
+    """
+    Long-lived publisher of ML tasks.
+
+    Keeps one connection and channel open, declares the queue once per
+    connection and reopens both when the broker drops them, retrying the
+    publish once (a batch is resent whole, so delivery is at-least-once).
+    pika connections are not thread-safe, so publishes are serialized by a lock.
+
+    A blocking connection answers broker heartbeats only while it is called,
+    so between publishes a daemon thread services it every heartbeat_interval
+    seconds under the same lock; otherwise an idle connection is dropped by the
+    broker and the next publish pays for a reconnect.
+
+    Attributes:
+        params (pika.ConnectionParameters): Broker connection parameters
+        queue (str): Queue name
+        confirm (bool): Wait for broker confirms of every message
+        heartbeat_interval (float): Seconds between idle servicing of the connection, 0 disables it
+        stats (PublishStats): Publish counters
+    """
+
+    def __init__(self, params=connection_params, queue: str = QUEUE_NAME, confirm: bool = PUBLISH_CONFIRMS,
+                 heartbeat_interval: float = HEARTBEAT / 2):
+        self.params = params
+        self.queue = queue
+        self.confirm = confirm
+        self.heartbeat_interval = heartbeat_interval
+        self.stats = PublishStats()
+        self._connection = None
+        self._channel = None
+        self._connections = 0
+        self._lock = threading.Lock()
+        self._heartbeats = None
+
+    def _ensure_channel(self):
+        if self._channel is not None and self._channel.is_open and self._connection.is_open:
+            return self._channel
+        self._reset()
+        self._connection = pika.BlockingConnection(self.params)
+        self._channel = self._connection.channel()
+        self._channel.queue_declare(queue=self.queue)  # Создание очереди (если не существует)
+        if self.confirm:
+            self._channel.confirm_delivery()
+        if self._connections:
+            self.stats.reconnects += 1
+        self._connections += 1
+        self._start_heartbeats()
+        return self._channel
+
+    def _start_heartbeats(self) -> None:
+        if not self.heartbeat_interval or self._heartbeats is not None:
+            return
+        self._heartbeats = threading.Event()
+        threading.Thread(target=self._service, args=(self._heartbeats,), name="rabbit-heartbeat",
+                         daemon=True).start()
+
+    def _service(self, stopped: threading.Event) -> None:
+        while not stopped.wait(self.heartbeat_interval):
+            with self._lock:
+                if self._connection is None or not self._connection.is_open:
+                    continue
+                try:
+                    # Обрабатывает heartbeat-кадры брокера, не дожидаясь событий
+                    self._connection.process_data_events(time_limit=0)
+                except pika.exceptions.AMQPError as e:
+                    logger.warning(f"RabbitMQ connection lost while idle: {e}")
+                    self._reset()
+
+    def _reset(self) -> None:
+        connection, self._connection, self._channel = self._connection, None, None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except pika.exceptions.AMQPError:
+                pass
+
+    def _publish(self, messages) -> None:
+        for attempt in range(2):
+            try:
+                channel = self._ensure_channel()
+                for message in messages:
+                    channel.basic_publish(exchange='', routing_key=self.queue, body=message)
+                return
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                self._reset()
+                if attempt:
+                    raise
+                logger.warning(f"RabbitMQ connection lost, reconnecting: {e}")
+
+    def publish_many(self, messages) -> None:
+        """
+        Publish messages over one channel.
+
+        With confirms every message is confirmed before the next one is sent;
+        AsyncTaskPublisher waits for the confirms of a batch together.
+        """
+        messages = list(messages)
+        start = time.perf_counter()
+        error = True
+        try:
+            with self._lock:
+                self._publish(messages)
+            error = False
+        finally:
+            self.stats.record(time.perf_counter() - start, error, len(messages))
+
+    def publish(self, message: str) -> None:
+        self.publish_many([message])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._heartbeats is not None:
+                self._heartbeats.set()
+                self._heartbeats = None
+            self._reset()
+
+
+class AsyncTaskPublisher:
+    """
+    asyncio counterpart of TaskPublisher on aio-pika.
+
+    Requires aio-pika. A robust connection reconnects by itself; with confirms
+    publish_many sends a whole batch and then waits for all its confirms.
+    """
+
+    def __init__(self, url: str | None = None, queue: str = QUEUE_NAME, confirm: bool = PUBLISH_CONFIRMS):
+        if aio_pika is None:
+            raise ImportError("AsyncTaskPublisher requires aio-pika")
+        self.url = url or f"amqp://{PIKA_USERNAME}:{PIKA_PASSWORD}@{RABBIT_HOST}:{RABBIT_PORT}/"
+        self.queue = queue
+        self.confirm = confirm
+        self.stats = PublishStats()
+        self._connection = None
+        self._channel = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_channel(self):
+        async with self._lock:
+            if self._channel is None or self._channel.is_closed:
+                if self._connection is None:
+                    self._connection = await aio_pika.connect_robust(self.url, heartbeat=30)
+                self._channel = await self._connection.channel(publisher_confirms=self.confirm)
+                await self._channel.declare_queue(self.queue)
+            return self._channel
+
+    async def publish_many(self, messages) -> None:
+        messages = list(messages)
+        start = time.perf_counter()
+        error = True
+        try:
+            channel = await self._ensure_channel()
+            await asyncio.gather(*[
+                channel.default_exchange.publish(aio_pika.Message(body=message.encode()), routing_key=self.queue)
+                for message in messages])
+            error = False
+        finally:
+            self.stats.record(time.perf_counter() - start, error, len(messages))
+
+    async def publish(self, message: str) -> None:
+        await self.publish_many([message])
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+        self._connection = self._channel = None
+
 
-    # Отправка сообщения
-    channel.queue_declare(queue=queue_name)  # Создание очереди (если не существует)
+publisher = TaskPublisher()
 
-    channel.basic_publish(
-        exchange='',
-        routing_key=queue_name,
-        body=message
-    )
 
-    # Закрытие соединения
-    connection.close()
\ No newline at end of file
+def send_task(message: str):
+    publisher.publish(message)
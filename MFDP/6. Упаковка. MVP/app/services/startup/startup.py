@@ -0,0 +1,115 @@
+import threading
+import time
+from fastapi import HTTPException, Request, status
+from loguru import logger
+from sqlmodel import Session
+from database.database import get_database_engine, init_schema, init_demo_users
+from models.model import Model
+from services.crud.model import add_model, get_model_by_params, init_model
+from helper.catalog import load_catalog
+
+STARTUP_STAGES = ["schema", "catalog", "model", "demo"]
+
+
+class StartupStages:
+    """
+    Progress of the startup stages, reported by the readiness probe.
+
+    Attributes:
+        stages (dict): Stage name -> status (pending, running, ready, failed),
+            duration_s and error
+    """
+
+    def __init__(self, names=STARTUP_STAGES):
+        self.stages = {name: {"status": "pending", "duration_s": None, "error": None} for name in names}
+        self._lock = threading.Lock()
+
+    def run(self, name: str, func, *args):
+        with self._lock:
+            self.stages[name]["status"] = "running"
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as e:
+            with self._lock:
+                self.stages[name].update(status="failed", duration_s=time.perf_counter() - start, error=str(e))
+            raise
+        with self._lock:
+            self.stages[name].update(status="ready", duration_s=time.perf_counter() - start)
+        logger.info(f"Startup stage {name} completed in {self.stages[name]['duration_s']:.2f}s")
+        return result
+
+    def is_ready(self, *names) -> bool:
+        with self._lock:
+            return all(self.stages[name]["status"] == "ready" for name in names or self.stages)
+
+    def error(self):
+        """First failed stage as "name: error", None while nothing failed."""
+        with self._lock:
+            return next((f"{name}: {stage['error']}" for name, stage in self.stages.items()
+                         if stage["status"] == "failed"), None)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(stage) for name, stage in self.stages.items()}
+
+
+def warmup(app, drop_all: bool = False) -> None:
+    """
+    Run the startup stages: schema, catalog, model warmup, demo data.
+
+    Args:
+        app: FastAPI application; results are stored in app.state.
+        drop_all: If True, drops all tables before creation.
+    """
+    stages = app.state.startup
+    engine = get_database_engine()
+
+    stages.run("schema", init_schema, drop_all)
+
+    def init_catalog():
+        # Таблица танков, JSON каталога и кандидаты модели обновляются вместе, одной заменой снимка
+        app.state.tanks.load(load_catalog())
+        app.state.tanks.start()
+
+    stages.run("catalog", init_catalog)
+
+    def warm_model():
+        with Session(engine) as session:
+            add_model(Model(), session)
+            init_model(get_model_by_params(session), app.state.models)
+
+    stages.run("model", warm_model)
+
+    def demo_data():
+        catalog = app.state.tanks.get()
+        with Session(engine) as session:
+            init_demo_users(session, catalog.general_df, catalog.candidates, app.state.models)
+
+    stages.run("demo", demo_data)
+
+
+def start_background_warmup(app, drop_all: bool = False) -> threading.Thread:
+    """Run warmup in a daemon thread, so the server binds right away."""
+
+    def run():
+        try:
+            warmup(app, drop_all)
+            logger.info("Application warmup completed successfully")
+        except Exception as e:
+            # Процесс продолжает жить, но /health/ready отвечает 503 с причиной
+            logger.critical(f"Warmup failed, service will not become ready: {app.state.startup.error() or e}")
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def require_ready(request: Request) -> None:
+    """Dependency rejecting prediction requests until the catalog and the model are loaded."""
+    if not request.app.state.startup.is_ready("catalog", "model"):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is warming up",
+            headers={"Retry-After": "5"},
+        )
@@ -1,12 +1,22 @@
 import pytest
 from sqlmodel import SQLModel, Session, create_engine
-from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool, NullPool
 from api import app
-from database.database import get_session
+from database.database import get_session, get_async_session
 from fastapi.testclient import TestClient
 from routes.user import get_current_active_user
 from routes.api_models import UserOut
 
+# NullPool: TestClient runs every request in its own event loop, aiosqlite connections can't be shared between them
+async_engine = create_async_engine("sqlite+aiosqlite:///testing.db", poolclass=NullPool)
+
+
+async def get_async_session_override():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
 
 @pytest.fixture(name="session")
 def session_fixture():
@@ -31,6 +41,7 @@ def client_fixture(session: Session):
         return session
 
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
 
     client = TestClient(app)
     yield client
@@ -47,6 +58,7 @@ def client_admin_fixture(session: Session):
         is_admin=True
     )
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
     app.dependency_overrides[get_current_active_user] = lambda: admin_user
 
     client = TestClient(app)
@@ -66,6 +78,7 @@ def client_common_fixture(session: Session):
         is_admin=False
     )
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
     app.dependency_overrides[get_current_active_user] = lambda: common_user
 
     client = TestClient(app)
@@ -73,3 +86,14 @@ def client_common_fixture(session: Session):
 
     yield client
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="max_queries")
+def max_queries_fixture():
+    """Checker of a route's query budget, reads the X-DB-Queries header of the response."""
+    def check(response, limit: int) -> int:
+        queries = int(response.headers["X-DB-Queries"])
+        assert queries <= limit, \
+            f"{response.request.method} {response.request.url.path}: {queries} queries, budget {limit}"
+        return queries
+    return check
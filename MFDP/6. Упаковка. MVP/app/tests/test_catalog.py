@@ -0,0 +1,69 @@
+import os
+import pandas as pd
+import pytest
+from helper import catalog
+from helper.helper import split_vehicles, DB_COLUMNS, GENERAL_COLUMNS, PREMIUM_COLUMNS
+
+
+def make_vehicles(tier=8):
+    vehicles = {}
+    for tank_id, is_premium in [(1, False), (17, True), (33, True)]:
+        profile = {}
+        for col in PREMIUM_COLUMNS[5:]:
+            node = profile
+            parts = col.split(".")[1:]
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            node[parts[-1]] = tank_id * 1.5
+        vehicles[str(tank_id)] = {"tank_id": tank_id, "name": f"tank {tank_id}", "tier": tier, "nation": "ussr",
+                                  "type": "heavyTank", "is_premium": is_premium,
+                                  "images": {"preview": None if tank_id == 33 else f"{tank_id}.png"},
+                                  "default_profile": profile}
+    return vehicles
+
+
+def test_split_vehicles():
+    general_df, premium_df, tanks_df = split_vehicles(make_vehicles())
+
+    assert general_df.tank_id.tolist() == [1]
+    assert premium_df.tank_id.tolist() == [17, 33]
+    assert premium_df["default_profile.armor.hull.front"].tolist() == [25.5, 49.5]
+    assert tanks_df.image.tolist() == ["1.png", "17.png", None]
+
+
+
+def test_split_vehicles_skips_nested_dicts():
+    vehicles = make_vehicles()
+    for vehicle in vehicles.values():
+        vehicle["modules_tree"] = {str(module_id): {"module_id": module_id, "next_modules": [module_id + 1],
+                                                    "price_xp": 100 * module_id} for module_id in range(12)}
+        vehicle["next_tanks"] = {"49": 70000}
+        vehicle["prices_xp"] = {"33": 45000}
+    general_df, premium_df, tanks_df = split_vehicles(vehicles)
+
+    assert list(general_df.columns) == GENERAL_COLUMNS
+    assert list(premium_df.columns) == PREMIUM_COLUMNS
+    assert list(tanks_df.columns) == DB_COLUMNS
+    assert tanks_df.image.tolist() == ["1.png", "17.png", None]
+
+def test_catalog_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "fetch_vehicles", make_vehicles)
+    root = str(tmp_path)
+    snapshot = catalog.load_catalog(root)
+    frames = split_vehicles(make_vehicles())
+
+    for expected, loaded in zip(frames, snapshot):
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), loaded)
+    assert catalog.refresh_catalog(root) == snapshot.version
+
+    monkeypatch.setattr(catalog, "fetch_vehicles", lambda: make_vehicles(tier=9))
+    version = catalog.refresh_catalog(root)
+
+    assert version != snapshot.version
+    assert catalog.load_catalog(root).premium_df.tier.tolist() == [9, 9]
+    assert os.path.exists(os.path.join(root, snapshot.version))
+
+
+def test_catalog_without_bootstrap(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        catalog.load_catalog(str(tmp_path), bootstrap=False)
@@ -0,0 +1,51 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import httpx
+from fastapi import status
+from fastapi.testclient import TestClient
+from api import app
+from models.model import Model
+from services.crud import event as EventService
+from services.crud import model as ModelService
+from services.crud.tank import TankCatalogCache
+from services.startup.startup import StartupStages
+
+PREDICTION_SECONDS = 1.0
+
+
+def test_health_during_prediction(client_common: TestClient, monkeypatch):
+    def slow_prediction(*args, **kwargs):
+        time.sleep(PREDICTION_SECONDS)
+        return {"candidates": []}
+
+    async def get_model(session):
+        return Model(model_id=1)
+
+    monkeypatch.setattr(ModelService, "get_model_by_params_async", get_model)
+    monkeypatch.setattr(ModelService, "init_model", lambda model, registry=None: None)
+    monkeypatch.setattr(EventService, "update_model_event", slow_prediction)
+    startup = StartupStages()
+    for name in startup.stages:
+        startup.run(name, lambda: None)
+    monkeypatch.setattr(app.state, "startup", startup)
+    tanks = TankCatalogCache()
+    tanks.snapshot = SimpleNamespace(general_df=None, candidates=None)
+    monkeypatch.setattr(app.state, "tanks", tanks)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            prediction = asyncio.create_task(client.get("/api/events/new_model_event"))
+            await asyncio.sleep(0.1)
+            health = await client.get("/health")
+            elapsed = time.perf_counter() - start
+            assert not prediction.done()
+            return health, elapsed, await prediction
+
+    health, elapsed, prediction = asyncio.run(scenario())
+
+    assert health.status_code == status.HTTP_200_OK
+    assert elapsed < PREDICTION_SECONDS / 2
+    assert prediction.status_code == status.HTTP_200_OK
@@ -1,3 +1,5 @@
+import json
+from datetime import datetime, timedelta
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
@@ -5,15 +7,20 @@ from api import app
 from services.crud import user as UserService
 from models.event import Prediction, PredictionCandidate
 from models.model import Model
-from sqlmodel import Session, select
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy import inspect
 from sqlalchemy.orm import selectinload
 from services.crud.tank import init_tanks
+from database.database import upgrade_schema
+from helper.catalog import load_catalog
+from routes.api_models import UserOut
+from routes.user import get_current_active_user
+from routes.pagination import DEFAULT_PAGE_SIZE
 
 
 def test_create_model_event(client_common: TestClient, session: Session):
-    general_df, premium_df = init_tanks(session)
-    client_common.app.state.general_df = general_df
-    client_common.app.state.premium_df = premium_df
+    init_tanks(session)
+    client_common.app.state.tanks.load(load_catalog())
 
     response = client_common.get("/api/events/new_model_event")
     query = select(Prediction).where(Prediction.creator_id == client_common.user_id)
@@ -37,6 +44,7 @@ def test_get_model_event_by_id(client_admin: TestClient, session: Session):
             "prediction_id": results.prediction_id,
             "creator_id": results.creator_id,
             "timestamp": results.timestamp.isoformat(),
+            "status": results.status,
             "candidates": [
                 {
                     "rank": c.rank,
@@ -121,3 +129,154 @@ def test_delete_all_events(client_admin: TestClient, session: Session):
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"message": "Events deleted successfully"}
     assert len(model_events_db) == 0
+
+
+def test_task_results_batch(client: TestClient, session: Session):
+    events = [Prediction(creator_id=1), Prediction(creator_id=2)]
+    session.add_all(events)
+    session.commit()
+    ids = [event.prediction_id for event in events]
+    body = {"results": [
+        {"prediction_id": prediction_id, "result": [
+            {"prediction_id": prediction_id, "rank": rank, "tank_id": 1, "predicted_damage": 1000 * rank}
+            for rank in (1, 2, 3)]}
+        for prediction_id in ids]}
+
+    first = client.post("/api/events/task_result", json=body)
+    redelivered = client.post("/api/events/task_result", json=body)
+    session.expire_all()
+    candidates = session.exec(select(PredictionCandidate).where(PredictionCandidate.prediction_id.in_(ids))).all()
+
+    assert first.status_code == status.HTTP_200_OK
+    assert redelivered.status_code == status.HTTP_200_OK
+    assert len(candidates) == 6
+    assert [session.get(Prediction, prediction_id).status for prediction_id in ids] == ["done", "done"]
+
+
+def test_task_results_skip_missing_predictions(client: TestClient, session: Session):
+    events = [Prediction(creator_id=1), Prediction(creator_id=2)]
+    session.add_all(events)
+    session.commit()
+    with_candidates, empty = [event.prediction_id for event in events]
+    missing = empty + 1000
+    body = {"results": [
+        {"prediction_id": missing, "result": [{"prediction_id": missing, "rank": 1, "tank_id": 1,
+                                               "predicted_damage": 1000}]},
+        {"prediction_id": with_candidates, "result": [{"prediction_id": with_candidates, "rank": 1, "tank_id": 1,
+                                                       "predicted_damage": 1000}]},
+        {"prediction_id": empty, "result": []}]}
+
+    response = client.post("/api/events/task_result", json=body)
+    session.expire_all()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["missing"] == [missing]
+    assert [session.get(Prediction, prediction_id).status for prediction_id in (with_candidates, empty)] == \
+        ["done", "done"]
+    assert len(session.exec(select(PredictionCandidate).where(
+        PredictionCandidate.prediction_id.in_([with_candidates, missing]))).all()) == 1
+
+
+def test_upgrade_schema_adds_status(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE prediction (prediction_id INTEGER PRIMARY KEY, creator_id INTEGER, "
+                             "timestamp DATETIME)")
+        conn.exec_driver_sql("INSERT INTO prediction (prediction_id, creator_id) VALUES (1, 1), (2, 1)")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO predictioncandidate (prediction_id, rank) VALUES (1, 1)")
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    with Session(engine) as session:
+        assert [event.status for event in session.exec(select(Prediction).order_by(Prediction.prediction_id))] == \
+            ["done", "pending"]
+    assert {index["name"] for index in inspect(engine).get_indexes("prediction")} >= \
+        {index.name for index in Prediction.__table__.indexes}
+    engine.dispose()
+
+
+def test_upgrade_schema_adds_artifact_path(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE model (model_id INTEGER PRIMARY KEY, version INTEGER, path VARCHAR)")
+        conn.exec_driver_sql("INSERT INTO model (model_id, version, path) VALUES (1, 1, './ml/model')")
+    SQLModel.metadata.create_all(engine)
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)
+
+    with Session(engine) as session:
+        model = session.get(Model, 1)
+    assert model.artifact_path is None
+    assert model.serving_path == "./ml/model"
+    engine.dispose()
+
+
+@pytest.fixture(name="history_client")
+def history_client_fixture(client: TestClient, session: Session):
+    user = UserOut(user_id=777, is_admin=False)
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    start = datetime(2025, 1, 1)
+    # Две последние записи с одинаковым временем: порядок между ними задаёт prediction_id
+    events = [Prediction(creator_id=user.user_id, timestamp=start + timedelta(minutes=min(i, 4))) for i in range(6)]
+    session.add_all(events)
+    session.commit()
+    client.event_ids = [event.prediction_id for event in events]
+    yield client
+    for event in events:
+        session.delete(event)
+    session.commit()
+
+
+def test_model_events_pages(history_client: TestClient):
+    latest = history_client.get("/api/events/retrieve_all_model_events", params={"limit": 4})
+    older = history_client.get("/api/events/retrieve_all_model_events",
+                               params={"limit": 4, "before": latest.headers["X-Prev-Cursor"]})
+    newer = history_client.get("/api/events/retrieve_all_model_events",
+                               params={"limit": 4, "after": older.headers["X-Next-Cursor"]})
+
+    assert [e["prediction_id"] for e in latest.json()] == history_client.event_ids[2:]
+    assert "X-Next-Cursor" not in latest.headers
+    assert 'rel="prev"' in latest.headers["Link"]
+    assert [e["prediction_id"] for e in older.json()] == history_client.event_ids[:2]
+    assert "X-Prev-Cursor" not in older.headers
+    assert [e["prediction_id"] for e in newer.json()] == history_client.event_ids[2:]
+    assert "X-Next-Cursor" not in newer.headers
+
+
+def test_model_events_default_page_is_newest(client: TestClient, session: Session):
+    user = UserOut(user_id=778, is_admin=False)
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    start = datetime(2025, 1, 1)
+    events = [Prediction(creator_id=user.user_id, timestamp=start + timedelta(minutes=i))
+              for i in range(DEFAULT_PAGE_SIZE + 5)]
+    session.add_all(events)
+    session.commit()
+
+    response = client.get("/api/events/retrieve_all_model_events")
+    ids = [event.prediction_id for event in events]
+    for event in events:
+        session.delete(event)
+    session.commit()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [e["prediction_id"] for e in response.json()] == ids[-DEFAULT_PAGE_SIZE:]
+    assert "X-Prev-Cursor" in response.headers and "X-Next-Cursor" not in response.headers
+
+
+def test_model_events_stream(history_client: TestClient):
+    response = history_client.get("/api/users/get_user_history", params={"stream": True})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [e["prediction_id"] for e in events] == history_client.event_ids
+
+
+def test_model_events_invalid_cursor(history_client: TestClient):
+    response = history_client.get("/api/events/retrieve_all_model_events", params={"after": "garbage"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,94 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from api import app
+from sqlalchemy import inspect
+from sqlmodel import create_engine
+from database import database
+from services.startup import startup as startup_module
+from services.startup.startup import StartupStages, start_background_warmup
+
+
+def test_liveness(client: TestClient):
+    response = client.get("/health/live")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "alive"}
+
+
+def test_readiness_while_warming_up(client_common: TestClient, monkeypatch):
+    startup = StartupStages()
+    startup.run("schema", lambda: None)
+    monkeypatch.setattr(app.state, "startup", startup)
+
+    ready = client_common.get("/health/ready")
+    prediction = client_common.get("/api/events/new_model_event")
+
+    assert ready.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert ready.json()["stages"]["schema"]["status"] == "ready"
+    assert ready.json()["stages"]["model"]["status"] == "pending"
+    assert prediction.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def test_readiness_when_ready(client: TestClient, monkeypatch):
+    startup = StartupStages()
+    for name in startup.stages:
+        startup.run(name, lambda: None)
+    monkeypatch.setattr(app.state, "startup", startup)
+    response = client.get("/health/ready")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["ready"]
+    assert all(stage["duration_s"] is not None for stage in response.json()["stages"].values())
+
+
+def test_failed_stage():
+    startup = StartupStages()
+
+    def fail():
+        raise RuntimeError("catalog unavailable")
+
+    with pytest.raises(RuntimeError):
+        startup.run("catalog", fail)
+
+    assert startup.snapshot()["catalog"]["status"] == "failed"
+    assert startup.snapshot()["catalog"]["error"] == "catalog unavailable"
+    assert not startup.is_ready("catalog")
+
+
+@pytest.fixture(name="old_engine")
+def old_engine_fixture(tmp_path, monkeypatch):
+    # База версии до артефактов и статусов предсказаний
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE model (model_id INTEGER PRIMARY KEY, version INTEGER, path VARCHAR)")
+        conn.exec_driver_sql("CREATE TABLE prediction (prediction_id INTEGER PRIMARY KEY, creator_id INTEGER, "
+                             "timestamp DATETIME)")
+    monkeypatch.setattr(database, "get_database_engine", lambda: engine)
+    monkeypatch.setattr(startup_module, "get_database_engine", lambda: engine)
+    yield engine
+    engine.dispose()
+
+
+def test_fast_start_upgrades_old_schema(old_engine):
+    startup = StartupStages()
+    startup.run("schema", database.init_schema)
+
+    assert startup.snapshot()["schema"]["status"] == "ready"
+    assert "artifact_path" in {col["name"] for col in inspect(old_engine).get_columns("model")}
+
+
+def test_fast_start_schema_check_fails_readiness(client: TestClient, old_engine, monkeypatch):
+    monkeypatch.setattr(database, "upgrade_schema", lambda engine: None)
+    monkeypatch.setattr(app.state, "startup", StartupStages())
+
+    start_background_warmup(app).join(timeout=10)
+    live = client.get("/health/live")
+    ready = client.get("/health/ready")
+
+    assert live.status_code == status.HTTP_200_OK
+    assert ready.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert ready.json()["stages"]["schema"]["status"] == "failed"
+    assert ready.json()["stages"]["catalog"]["status"] == "pending"
+    assert "schema is out of date" in ready.json()["error"]
+    assert "model.artifact_path" in ready.json()["error"]
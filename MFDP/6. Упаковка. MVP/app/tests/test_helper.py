@@ -0,0 +1,80 @@
+import json
+import numpy as np
+import pytest
+from helper import helper
+from helper.helper import parse_user_data, BlitzApiError, USER_DATA_COLUMNS, USER_STATS_COLUMNS
+
+USER_ID = 88444060
+
+
+def make_payload(tanks):
+    return json.dumps({"status": "ok", "data": {str(USER_ID): tanks}}).encode()
+
+
+def test_parse_user_data():
+    tanks = [{"tank_id": tank_id, "battle_life_time": 1000, "mark_of_mastery": mastery,
+              "all": {col: tank_id + i for i, col in enumerate(USER_STATS_COLUMNS)}}
+             for tank_id, mastery in [(1, 3), (17, 0)]]
+    user_df = parse_user_data(make_payload(tanks), USER_ID)
+
+    assert list(user_df.columns) == USER_DATA_COLUMNS
+    assert user_df.tank_id.tolist() == [1, 17]
+    assert (user_df.user_id == USER_ID).all()
+    assert user_df.battles.dtype == np.int32 and user_df.mark_of_mastery.dtype == np.int64
+    assert user_df.damage_dealt.tolist() == [1 + USER_STATS_COLUMNS.index("damage_dealt"),
+                                             17 + USER_STATS_COLUMNS.index("damage_dealt")]
+
+
+def test_parse_user_data_missing_values():
+    tanks = [{"tank_id": 1, "battle_life_time": 10, "mark_of_mastery": 1, "all": {"battles": 2 ** 40}}]
+    user_df = parse_user_data(make_payload(tanks), USER_ID)
+
+    assert user_df.battles.dtype == np.int64 and user_df.battles[0] == 2 ** 40
+    assert user_df.wins.dtype == np.float32 and np.isnan(user_df.wins[0])
+
+
+def test_parse_user_data_empty():
+    user_df = parse_user_data(b'{"status": "ok", "data": {"88444060": null}}', USER_ID)
+
+    assert user_df.empty
+    assert list(user_df.columns) == USER_DATA_COLUMNS
+
+
+def test_get_users_data(monkeypatch):
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, account_ids):
+            self.content = json.dumps({"status": "ok", "data": {
+                account_id: [{"tank_id": 1, "battle_life_time": 1, "mark_of_mastery": 0, "all": {"battles": 5}}]
+                for account_id in account_ids}}).encode()
+
+    def fake_get(path, params):
+        calls.append(params["account_id"])
+        return Response(params["account_id"].split(","))
+
+    monkeypatch.setattr(helper.BLITZ_API, "get", fake_get)
+    monkeypatch.setattr(helper, "MAX_ACCOUNTS_PER_CALL", 2)
+    users_data = helper.get_users_data([1, 2, 3, 1])
+
+    assert calls == ["1,2", "3"]
+    assert sorted(users_data) == [1, 2, 3]
+    assert users_data[3].user_id.tolist() == [3]
+
+
+def test_parse_user_data_api_error():
+    with pytest.raises(BlitzApiError):
+        parse_user_data(b'{"status": "error", "error": {"code": 407, "message": "REQUEST_LIMIT_EXCEEDED"}}', USER_ID)
+
+
+def test_get_users_data_http_error(monkeypatch):
+    class Response:
+        status_code = 503
+        content = b"Service Unavailable"
+
+    monkeypatch.setattr(helper.BLITZ_API, "get", lambda path, params: Response())
+
+    with pytest.raises(BlitzApiError):
+        helper.get_users_data([1, 2])
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from helper.http import ApiClient, AsyncApiClient
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 to the first request of every path, 200 afterwards."""
+
+    seen = set()
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        status = 200 if path in self.seen else 503
+        self.seen.add(path)
+        body = b'{"status": "ok"}'
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="server_url")
+def server_url_fixture():
+    FlakyHandler.seen = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/wotb"
+    server.shutdown()
+
+
+def test_api_client_retries(server_url):
+    client = ApiClient(server_url, backoff=0.01)
+    response = client.get("/tanks/stats/", params={"account_id": 1})
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+    assert client.stats.snapshot()["/wotb/tanks/stats/"]["count"] == 1
+    assert client.stats.snapshot()["/wotb/tanks/stats/"]["errors"] == 0
+
+
+def test_api_client_gives_up(server_url):
+    client = ApiClient(server_url, retries=0)
+    response = client.get("/encyclopedia/vehicles/")
+
+    assert response.status_code == 503
+    assert client.stats.snapshot()["/wotb/encyclopedia/vehicles/"]["errors"] == 1
+
+
+def test_async_api_client_retries(server_url):
+    async def fetch():
+        client = AsyncApiClient(server_url, backoff=0.01)
+        try:
+            return await client.get("/tanks/stats/"), client.stats.snapshot()
+        finally:
+            await client.aclose()
+
+    response, stats = asyncio.run(fetch())
+
+    assert response.status_code == 200
+    assert stats["/wotb/tanks/stats/"]["count"] == 1
@@ -49,7 +49,8 @@ def test_get_model_by_id(client_common: TestClient):
     answer = {
         "model_id": 1,
         "version": 1,
-        "path": "./ml/AutogluonModels/ag-20251205_150250"
+        "path": "./ml/AutogluonModels/ag-20251205_150250",
+        "artifact_path": None
     }
     response = client_common.get("/api/models/id/{model_id}".format(**payload))
 
@@ -85,3 +86,16 @@ def test_get_model_by_non_existent_params(client_common: TestClient):
 
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": answer}
+
+
+def test_add_model_with_artifact(client_common: TestClient):
+    message = {
+        "version": 2,
+        "path": "./ml/AutogluonModels/ag-20251205_150250",
+        "artifact_path": "./ml/AutogluonModels/deploy/refit"
+    }
+    response = client_common.post("/api/models/new_model", json=message)
+    model = client_common.get("/api/models/params", params={"version": 2, "path": message["path"]}).json()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert model["artifact_path"] == message["artifact_path"]
@@ -0,0 +1,282 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from helper.helper import parse_user_data, USER_STATS_COLUMNS
+from ml.layout import LayoutPlan
+from ml.ranking import top_k
+from ml.cache import ResultCache
+from ml.prediction import PREDICTION_COLUMNS, LAYOUT, CandidateBlock, assemble, preprocessing, predict_many, \
+    user_vector
+
+USER_ID = 88444060
+PREMIUM_TANKS = [100001, 100002, 100003, 100004]
+
+
+@pytest.fixture(name="frames")
+def frames_fixture():
+    general_tank, other_tank = [int(tank_id) for tank_id in LAYOUT.user_tank_ids[:2]]
+    general_df = pd.DataFrame({"tank_id": [general_tank, other_tank], "nation": "ussr", "tier": 8,
+                               "type": "heavyTank", "name": "general"})
+    premium_df = pd.DataFrame({"tank_id": PREMIUM_TANKS, "nation": ["ussr", "usa", "germany", "uk"],
+                               "tier": [8, 4, 7, 6], "type": "mediumTank", "name": "premium",
+                               "default_profile.signal_range": 0})
+    for col in LAYOUT.profile_columns:
+        premium_df[col] = np.arange(len(PREMIUM_TANKS)) * 10
+    stats = {stat: [1000, 1000, 1000] for stat in LAYOUT.user_stats}
+    stats.update({"battles": [100, 5, 10], "wins": [50, 2, 5], "losses": [40, 2, 5], "mark_of_mastery": [3, 1, 0]})
+    user_df = pd.DataFrame({"user_id": USER_ID, "tank_id": [general_tank, other_tank, PREMIUM_TANKS[0]], **stats})
+    return user_df, general_df, premium_df
+
+
+def test_preprocessing_layout(frames):
+    X = preprocessing(*frames)
+
+    assert list(X.columns) == ["user_id", "tank_id"] + list(PREDICTION_COLUMNS)
+    assert X.tank_id.tolist() == [100003, 100004]
+    assert (X.user_id == USER_ID).all()
+    assert not (X.dtypes == object).any()
+
+
+def test_preprocessing_user_features(frames):
+    user_df, _, _ = frames
+    general_tank = int(LAYOUT.user_tank_ids[0])
+    X = preprocessing(*frames)
+    num_pos = LAYOUT.num_columns.index(f"damage_dealt_{general_tank}")
+    expected = (np.float32(1000 / 100) - LAYOUT.means[num_pos]) / LAYOUT.stds[num_pos]
+
+    assert (X[f"damage_dealt_{general_tank}"] == expected).all()
+    assert X[f"damage_dealt_{int(LAYOUT.user_tank_ids[1])}"].isna().all()
+    assert X[f"mark_of_mastery_{general_tank}"].tolist() == [3, 3]
+
+
+def test_preprocessing_without_qualifying_tanks(frames):
+    user_df, general_df, premium_df = frames
+    user_df["battles"] = 0
+    X = preprocessing(user_df, general_df, premium_df)
+
+    assert X.empty
+
+
+def test_candidate_block(frames):
+    user_df, general_df, premium_df = frames
+    candidates = CandidateBlock(premium_df)
+
+    assert candidates.tank_ids.tolist() == [100001, 100003, 100004]
+    assert not candidates.profile.flags.writeable
+    pd.testing.assert_frame_equal(preprocessing(user_df, general_df, candidates),
+                                  preprocessing(user_df, general_df, premium_df))
+
+
+
+def legacy_preprocessing(user_df, general_df, premium_df):
+    """pandas preprocessing before LayoutPlan, the reference of the model input."""
+    user_general_df = user_df[user_df.tank_id.isin(general_df.tank_id.values)]
+    user_general_df = user_general_df.query("(battles >= wins + losses) & (battles > 10) & (damage_dealt > 0)").copy()
+    avg_cols = user_general_df.drop(["user_id", "tank_id", "max_xp", "battles", "max_frags", "mark_of_mastery"],
+                                    axis=1).columns
+    user_general_df[avg_cols] = user_general_df[avg_cols].div(user_general_df["battles"], axis=0).astype("float32")
+    already_has = user_df[user_df.tank_id.isin(premium_df.tank_id.values)].tank_id.values
+    predict_prem_df = premium_df[~premium_df.tank_id.isin(already_has)].query("tier >= 5")
+    predict_prem_df = predict_prem_df.drop(["name", "default_profile.signal_range"], axis=1)
+
+    user_general_df = user_general_df.pivot(index="user_id", columns="tank_id")
+    user_general_df.columns = ["_".join([str(part) for part in col if part not in (None, "")]) for col in
+                               user_general_df.columns]
+    user_general_df.reset_index(inplace=True)
+
+    prem_cols = ["tank_id"] + [col for col in predict_prem_df.columns if "default_profile" in col] + \
+        ["nation", "tier", "type"]
+    X = user_general_df.merge(predict_prem_df[prem_cols], how="cross")
+    needed_columns = list(set(PREDICTION_COLUMNS).difference(set(X.columns)))
+    X = pd.concat([X, pd.DataFrame(columns=needed_columns)], axis=1)
+    X = X[["user_id", "tank_id"] + list(PREDICTION_COLUMNS)]
+
+    cat_cols = [col for col in X.columns if "mark_of_mastery" in col] + ["nation", "tier", "type"]
+    num_cols = [col for col in X.columns if col not in ["user_id", "tank_id"] + cat_cols]
+    X[num_cols] = (X[num_cols].to_numpy(dtype=np.float32) - LAYOUT.means) / LAYOUT.stds
+    X[cat_cols] = X[cat_cols].astype("category")
+    return X
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_preprocessing_matches_legacy(seed):
+    rng = np.random.default_rng(seed)
+    general_ids = [int(tank_id) for tank_id in rng.choice(LAYOUT.user_tank_ids, 6, replace=False)]
+    general_df = pd.DataFrame({"tank_id": general_ids, "nation": "ussr", "tier": 8, "type": "heavyTank",
+                               "name": "general"})
+    premium_df = pd.DataFrame({"tank_id": PREMIUM_TANKS + [100005],
+                               "nation": ["ussr", "usa", "germany", "uk", "ussr"], "tier": [8, 4, 7, 6, 10],
+                               "type": ["mediumTank", "heavyTank", "mediumTank", "AT-SPG", "lightTank"],
+                               "name": "premium"})
+    for col in ["default_profile.signal_range"] + LAYOUT.profile_columns:
+        premium_df[col] = rng.integers(0, 1000, len(premium_df)).astype(float)
+    tanks = []
+    # Общие танки, танк вне модели и уже купленный премиум
+    for tank_id in general_ids + [999999, PREMIUM_TANKS[0]]:
+        battles = int(rng.integers(5, 500))
+        stats = {col: int(rng.integers(100, 5000)) for col in USER_STATS_COLUMNS}
+        stats.update(battles=battles, wins=battles // 2, losses=battles // 3)
+        tanks.append({"tank_id": tank_id, "battle_life_time": int(rng.integers(1000, 9000)),
+                      "mark_of_mastery": int(rng.integers(0, 4)), "all": stats})
+    user_df = parse_user_data(json.dumps({"status": "ok", "data": {str(USER_ID): tanks}}).encode(), USER_ID)
+
+    expected = legacy_preprocessing(user_df, general_df, premium_df).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(preprocessing(user_df, general_df, premium_df), expected, check_exact=True)
+
+def test_layout_plan_roundtrip(tmp_path):
+    LAYOUT.dump(str(tmp_path))
+    plan = LayoutPlan.load(str(tmp_path))
+
+    assert plan.columns == LAYOUT.columns
+    assert np.array_equal(plan.num_slots, LAYOUT.num_slots)
+    assert [plan.columns[slot] for slot in plan.cat_slots][-3:] == ["nation", "tier", "type"]
+    tank_id = int(plan.user_tank_ids[0])
+    stat_pos = plan.user_stats.index("damage_dealt")
+    assert plan.user_slot_matrix[0, stat_pos] == plan.slots[f"damage_dealt_{tank_id}"]
+
+
+class ProfileModel:
+    """Stub predictor scoring candidates by their first profile feature."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return X[LAYOUT.profile_columns[0]] * 100 + X[f"damage_dealt_{int(LAYOUT.user_tank_ids[0])}"]
+
+
+def test_predict_many(frames):
+    user_df, general_df, premium_df = frames
+    candidates = CandidateBlock(premium_df)
+    other_df = user_df.assign(user_id=1, tank_id=user_df.tank_id.replace({PREMIUM_TANKS[0]: PREMIUM_TANKS[2]}))
+    user_data = {USER_ID: user_df, 1: other_df}
+
+    model = ProfileModel()
+    results = predict_many(model, [USER_ID, 1], general_df, candidates, k=1, user_data=user_data)
+    chunked_model = ProfileModel()
+    chunked = predict_many(chunked_model, [USER_ID, 1], general_df, candidates, k=1, max_rows=2,
+                           user_data=user_data)
+
+    assert model.calls == [4]
+    assert chunked_model.calls == [2, 2]
+    assert results[USER_ID].tank_id.tolist() == [100004]
+    assert results[1].tank_id.tolist() == [100004]
+    for user_id in user_data:
+        pd.testing.assert_frame_equal(results[user_id], chunked[user_id])
+
+
+
+def frame_bytes(X):
+    # Байты данных без таблиц категорий: они общие для всех чанков
+    return sum(X[column].cat.codes.nbytes if isinstance(X[column].dtype, pd.CategoricalDtype)
+               else X[column].to_numpy().nbytes for column in X.columns)
+
+
+def test_predict_many_chunk_bytes(frames):
+    user_df, general_df, premium_df = frames
+    candidates = CandidateBlock(premium_df)
+    user_data = {user_id: user_df.assign(user_id=user_id) for user_id in (USER_ID, 1, 2)}
+    row = assemble(np.array([USER_ID]), user_vector(user_df, general_df)[0][None, :],
+                   [np.array([0])], candidates, with_ids=False)
+    max_bytes = 5 * frame_bytes(row)
+
+    class SizeModel(ProfileModel):
+        sizes = []
+
+        def predict(self, X):
+            self.sizes.append(frame_bytes(X))
+            return super().predict(X)
+
+    model = SizeModel()
+    predict_many(model, list(user_data), general_df, candidates, max_bytes=max_bytes, user_data=user_data)
+
+    assert len(model.calls) > 1
+    assert all(nbytes <= max_bytes for nbytes in model.sizes)
+
+
+def test_predict_many_result_cache(frames):
+    user_df, general_df, premium_df = frames
+    candidates = CandidateBlock(premium_df)
+    cache = ResultCache()
+    model = ProfileModel()
+    kwargs = {"cache": cache, "model_key": 1}
+
+    first = predict_many(model, [USER_ID], general_df, candidates, user_data={USER_ID: user_df}, **kwargs)
+    second = predict_many(model, [USER_ID], general_df, candidates, user_data={USER_ID: user_df}, **kwargs)
+    predict_many(model, [USER_ID], general_df, candidates, user_data={USER_ID: user_df.assign(wins=51)}, **kwargs)
+    predict_many(model, [USER_ID], general_df, CandidateBlock(premium_df.assign(tier=8)),
+                 user_data={USER_ID: user_df}, **kwargs)
+
+    assert model.calls == [2, 2, 3]
+    assert second[USER_ID] is first[USER_ID]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_result_cache_eviction(monkeypatch):
+    cache = ResultCache(ttl=10, max_items=2)
+    for key in "abc":
+        cache.put(key, key.upper())
+
+    assert cache.get("a") is None and cache.get("c") == "C"
+    monkeypatch.setattr("ml.cache.time.monotonic", lambda: float("inf"))
+    assert cache.get("c") is None and len(cache) == 1
+
+
+class FakeRedis:
+    """In-memory stand-in for redis.Redis, shared by every cache created from the same URL."""
+
+    servers = {}
+
+    def __init__(self, url):
+        self.data = self.servers.setdefault(url, {})
+        self.down = False
+
+    @classmethod
+    def from_url(cls, url):
+        return cls(url)
+
+    def get(self, name):
+        if self.down:
+            raise ConnectionError("redis is down")
+        return self.data.get(name, (None,))[0]
+
+    def set(self, name, value, ex=None):
+        self.data[name] = (value, ex)
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+
+def test_result_cache_shared_tier(monkeypatch):
+    monkeypatch.setattr("ml.cache.redis", SimpleNamespace(Redis=FakeRedis))
+    monkeypatch.setattr(FakeRedis, "servers", {})
+    api, worker = (ResultCache(ttl=60, shared_url="redis://cache") for _ in range(2))
+    key = (1, USER_ID, "stats", "catalog")
+
+    worker.put(key, {"preds": [1, 2]})
+    assert FakeRedis.servers["redis://cache"]["predict:" + ":".join(map(str, key))][1] == 60
+    assert api.get(key) == {"preds": [1, 2]} and len(api) == 1
+
+    api.clear()
+    worker.invalidate(key)
+    assert api.get(key) is None
+
+    worker.put(key, "value")
+    api.shared._client.down = True
+    assert api.get(key) is None
+    assert api.stats() == {"hits": 1, "misses": 2, "size": 0, "shared": True}
+
+
+def test_top_k():
+    scores = np.array([[1.0, 3.0, 3.0, np.nan, 2.0],
+                       [np.nan, np.nan, np.nan, 1.0, np.nan]])
+    top, values = top_k(scores, 3, tie_break=[0, 9, 5, 0, 0])
+
+    assert top[0].tolist() == [2, 1, 4]
+    assert values[0].tolist() == [3.0, 3.0, 2.0]
+    assert top[1, 0] == 3 and np.isneginf(values[1, 1:]).all()
+    assert top_k(scores[0], 2)[0].tolist() == [1, 2]
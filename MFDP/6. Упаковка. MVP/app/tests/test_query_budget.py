@@ -0,0 +1,77 @@
+import pandas as pd
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from api import app
+from database import instrumentation
+from models.event import Prediction, PredictionCandidate
+from models.user import User
+from services.crud import tank as TankService
+from services.crud import user as UserService
+
+USER_ID = 555
+
+
+def make_history(session: Session):
+    if UserService.get_user_by_id(USER_ID, session):
+        return
+    TankService.sync_tanks(session, pd.DataFrame({
+        "tank_id": [1, 17], "name": ["tank 1", "tank 17"], "tier": [8, 8], "nation": ["ussr", "ussr"],
+        "type": ["heavyTank", "heavyTank"], "is_premium": [False, True], "image": ["1.png", "17.png"]}))
+    UserService.create_user(User(user_id=USER_ID), session)
+    for _ in range(3):
+        event = Prediction(creator_id=USER_ID)
+        session.add(event)
+        session.commit()
+        session.add_all([PredictionCandidate(prediction_id=event.prediction_id, rank=rank, tank_id=tank_id,
+                                             predicted_damage=1000) for rank, tank_id in [(1, 1), (2, 17)]])
+        session.commit()
+
+
+def test_current_user_budget(client: TestClient, session: Session, max_queries):
+    make_history(session)
+    app.state.principals.clear()
+    client.cookies.set("access_token", str(USER_ID))
+    response = client.get("/api/users/me")
+
+    assert response.status_code == status.HTTP_200_OK
+    # Пользователь загружается без истории его предсказаний: аутентификация и сам /me
+    assert max_queries(response, 2) == 2
+
+
+def test_history_budget(client: TestClient, session: Session, max_queries):
+    make_history(session)
+    client.cookies.set("access_token", str(USER_ID))
+    response = client.get("/api/users/get_user_history")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 3
+    max_queries(response, 2)
+
+
+def test_tank_budget(client: TestClient, session: Session, max_queries):
+    make_history(session)
+    response = client.get("/api/tanks/tanks/17")
+
+    assert response.status_code == status.HTTP_200_OK
+    max_queries(response, 1)
+
+
+def test_route_metrics(client: TestClient):
+    client.get("/health")
+    response = client.get("/health/db")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["GET /health"]["queries"] == 0
+    assert response.headers["X-DB-Queries"] == "0"
+
+
+def test_slow_query_log(client: TestClient, session: Session, monkeypatch):
+    make_history(session)
+    logged = []
+    monkeypatch.setattr(instrumentation, "slow_query_ms", 0)
+    monkeypatch.setattr(instrumentation.logger, "warning", logged.append)
+    client.cookies.set("access_token", str(USER_ID))
+    client.get("/api/users/get_user_history")
+
+    assert any("plan=[" in message for message in logged)
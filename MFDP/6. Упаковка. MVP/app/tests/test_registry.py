@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from ml import registry as registry_module
+from ml.registry import PredictorRegistry
+
+
+class StubPredictor:
+    """Stub TabularPredictor counting loads."""
+
+    loads = 0
+
+    def __init__(self, path):
+        self.path = path
+        self.persisted = False
+
+    @classmethod
+    def load(cls, path):
+        cls.loads += 1
+        time.sleep(0.05)
+        return cls(path)
+
+    def persist(self):
+        self.persisted = True
+        return ["stub"]
+
+    def model_info(self, model):
+        return {"memory_size": 3 * 2 ** 20}
+
+    def unpersist(self):
+        self.persisted = False
+
+
+@pytest.fixture(name="artifact")
+def artifact_fixture(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry_module, "TabularPredictor", StubPredictor)
+    StubPredictor.loads = 0
+    (tmp_path / "predictor.pkl").write_bytes(b"v1")
+    return str(tmp_path)
+
+
+def test_registry_concurrent_load(artifact):
+    registry = PredictorRegistry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get(artifact, key=1))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert StubPredictor.loads == 1
+    assert all(predictor is results[0] for predictor in results)
+    assert results[0].persisted
+    assert registry.stats()["hits"] == 7 and registry.stats()["misses"] == 1
+
+
+def test_registry_reloads_changed_artifact(artifact):
+    registry = PredictorRegistry()
+    first = registry.get(artifact, key=1)
+    with open(os.path.join(artifact, "predictor.pkl"), "wb") as file:
+        file.write(b"v2 rewritten")
+    second = registry.get(artifact, key=1)
+
+    assert second is not first
+    assert len(registry) == 1
+
+
+
+def test_registry_reloads_same_size_artifact(artifact):
+    registry = PredictorRegistry()
+    first = registry.get(artifact, key=1)
+    file_path = os.path.join(artifact, "predictor.pkl")
+    stat = os.stat(file_path)
+    # Замена того же размера с сохранённым mtime, как после cp -p или rsync
+    with open(file_path, "wb") as file:
+        file.write(b"v2")
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert registry.get(artifact, key=1) is not first
+    assert StubPredictor.loads == 2
+
+
+def test_registry_eviction_keeps_predictor_usable(artifact, tmp_path_factory):
+    other = tmp_path_factory.mktemp("other")
+    (other / "predictor.pkl").write_bytes(b"other")
+    registry = PredictorRegistry(max_items=2, max_bytes=4 * 2 ** 20)
+    in_use = registry.get(artifact, key=1)
+    registry.get(str(other), key=2)
+
+    assert len(registry) == 1
+    assert registry.stats()["size_bytes"] == 3 * 2 ** 20
+    assert in_use.persisted
+
+def test_registry_stats_route(client: TestClient):
+    response = client.get("/api/models/registry")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {"hits", "misses", "loaded", "size_bytes"} <= response.json().keys()
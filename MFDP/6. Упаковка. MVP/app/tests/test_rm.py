@@ -0,0 +1,194 @@
+import asyncio
+import time
+import pika
+import pytest
+from services.rm import rm
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.is_open = True
+        self.confirms = False
+
+    def queue_declare(self, queue):
+        self.connection.declared.append(queue)
+
+    def confirm_delivery(self):
+        self.confirms = True
+
+    def basic_publish(self, exchange, routing_key, body):
+        if self.connection.fail:
+            self.connection.fail -= 1
+            self.connection.is_open = False
+            raise pika.exceptions.StreamLostError("connection reset")
+        self.connection.published.append((routing_key, body))
+
+
+class FakeBroker:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.connections = []
+
+    def connect(self, params):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+
+class FakeConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+        self.declared = []
+        self.published = []
+        self.serviced = 0
+
+    @property
+    def fail(self):
+        return self.broker.fail
+
+    @fail.setter
+    def fail(self, value):
+        self.broker.fail = value
+
+    def channel(self):
+        return FakeChannel(self)
+
+    def process_data_events(self, time_limit):
+        self.serviced += 1
+
+    def close(self):
+        self.is_open = False
+
+
+def test_publisher_reuses_connection(monkeypatch):
+    broker = FakeBroker()
+    monkeypatch.setattr(pika, "BlockingConnection", broker.connect)
+    publisher = rm.TaskPublisher(params=None)
+
+    for i in range(3):
+        publisher.publish(f"task {i}")
+
+    assert len(broker.connections) == 1
+    assert broker.connections[0].declared == [rm.QUEUE_NAME]
+    assert [body for _, body in broker.connections[0].published] == ["task 0", "task 1", "task 2"]
+    assert publisher.stats.snapshot()["count"] == 3
+
+
+def test_publisher_reconnects(monkeypatch):
+    broker = FakeBroker(fail=1)
+    monkeypatch.setattr(pika, "BlockingConnection", broker.connect)
+    publisher = rm.TaskPublisher(params=None, confirm=True)
+
+    publisher.publish_many(["task 0", "task 1"])
+    stats = publisher.stats.snapshot()
+
+    assert len(broker.connections) == 2
+    assert [body for _, body in broker.connections[1].published] == ["task 0", "task 1"]
+    assert stats["reconnects"] == 1
+    assert stats["count"] == 2
+    assert stats["errors"] == 0
+
+
+def test_publisher_gives_up(monkeypatch):
+    broker = FakeBroker(fail=2)
+    monkeypatch.setattr(pika, "BlockingConnection", broker.connect)
+    publisher = rm.TaskPublisher(params=None)
+
+    with pytest.raises(pika.exceptions.AMQPConnectionError):
+        publisher.publish("task")
+
+    stats = publisher.stats.snapshot()
+    assert stats["errors"] == 1
+    assert stats["calls"] == 1 and stats["avg_ms"] == stats["total_ms"]
+
+
+def test_publisher_services_heartbeats(monkeypatch):
+    broker = FakeBroker()
+    monkeypatch.setattr(pika, "BlockingConnection", broker.connect)
+    publisher = rm.TaskPublisher(params=None, heartbeat_interval=0.01)
+
+    publisher.publish("task")
+    deadline = time.monotonic() + 2
+    while broker.connections[0].serviced < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    publisher.close()
+
+    assert broker.connections[0].serviced >= 2
+    assert len(broker.connections) == 1
+
+
+class FakeAioExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, message.body))
+
+
+class FakeAioChannel:
+    def __init__(self, confirms):
+        self.confirms = confirms
+        self.is_closed = False
+        self.declared = []
+        self.default_exchange = FakeAioExchange()
+
+    async def declare_queue(self, queue):
+        self.declared.append(queue)
+
+
+class FakeAioConnection:
+    def __init__(self):
+        self.channels = []
+        self.closed = False
+
+    async def channel(self, publisher_confirms):
+        self.channels.append(FakeAioChannel(publisher_confirms))
+        return self.channels[-1]
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeAioPika:
+    """Stands in for the aio_pika module: robust connections and messages."""
+
+    def __init__(self):
+        self.connections = []
+
+    async def connect_robust(self, url, heartbeat):
+        self.connections.append(FakeAioConnection())
+        return self.connections[-1]
+
+    class Message:
+        def __init__(self, body):
+            self.body = body
+
+
+def test_async_publisher(monkeypatch):
+    aio_pika = FakeAioPika()
+    monkeypatch.setattr(rm, "aio_pika", aio_pika)
+    publisher = rm.AsyncTaskPublisher(url="amqp://test", confirm=True)
+
+    async def run():
+        await publisher.publish_many(["task 0", "task 1"])
+        await publisher.publish("task 2")
+        await publisher.close()
+
+    asyncio.run(run())
+    [connection] = aio_pika.connections
+    [channel] = connection.channels
+
+    assert channel.confirms and channel.declared == [rm.QUEUE_NAME]
+    assert channel.default_exchange.published == [(rm.QUEUE_NAME, body) for body in (b"task 0", b"task 1", b"task 2")]
+    assert connection.closed
+    assert publisher.stats.snapshot()["count"] == 3
+    assert publisher.stats.snapshot()["calls"] == 2
+
+
+def test_async_publisher_requires_aio_pika(monkeypatch):
+    monkeypatch.setattr(rm, "aio_pika", None)
+
+    with pytest.raises(ImportError):
+        rm.AsyncTaskPublisher()
@@ -1,9 +1,15 @@
 import jwt
+import pandas as pd
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
 from api import app
-from services.crud import tank as UserService
+from services.crud import tank as TankService
+from services.crud.tank import TankCatalogCache
+from helper.catalog import Catalog, load_catalog, write_snapshot
+from helper.helper import split_vehicles
+from tests.test_catalog import make_vehicles
 
 
 def test_get_tank_by_id(client_common: TestClient):
@@ -18,4 +24,87 @@ def test_get_all_tanks(client_common: TestClient):
     response = client_common.get("/api/tanks/retrieve_all_tanks")
 
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() is not None
\ No newline at end of file
+    assert response.json() is not None
+
+@pytest.fixture(name="tank_session")
+def tank_session_fixture(tmp_path):
+    # Отдельная база: строки танков из этих тестов не попадают в общую testing.db
+    engine = create_engine(f"sqlite:///{tmp_path / 'tanks.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_sync_tanks(tank_session):
+    tanks_df = pd.DataFrame({"tank_id": [1, 17], "name": ["tank 1", "tank 17"], "tier": [8, 8],
+                             "nation": ["ussr", "ussr"], "type": ["heavyTank", "heavyTank"],
+                             "is_premium": [False, True], "image": ["1.png", None]})
+
+    assert TankService.sync_tanks(tank_session, tanks_df) == {"inserted": 2, "updated": 0, "unchanged": 0}
+    assert TankService.sync_tanks(tank_session, tanks_df) == {"inserted": 0, "updated": 0, "unchanged": 2}
+
+    tanks_df.loc[1, "tier"] = 9
+    tanks_df.loc[2] = [33, "tank 33", 6, "germany", "mediumTank", False, "33.png"]
+
+    assert TankService.sync_tanks(tank_session, tanks_df) == {"inserted": 1, "updated": 1, "unchanged": 1}
+    assert TankService.get_tank_by_id(17, tank_session).tier == 9
+    assert TankService.get_tank_by_id(17, tank_session).image is None
+
+
+@pytest.fixture(name="tank_snapshot")
+def tank_snapshot_fixture(monkeypatch):
+    tanks_df = pd.DataFrame({"tank_id": [1, 17], "name": ["tank 1", "tank 17"], "tier": [8, 8],
+                             "nation": ["ussr", "ussr"], "type": ["heavyTank", "heavyTank"],
+                             "is_premium": [False, True], "image": ["1.png", "17.png"]})
+    cache = TankCatalogCache(check_interval=3600)
+    cache.load(Catalog("v1", "hash", {"general": None, "premium": None, "tanks": tanks_df}))
+    monkeypatch.setattr(app.state, "tanks", cache)
+    return cache
+
+
+def test_all_tanks_etag(client: TestClient, tank_snapshot, max_queries):
+    response = client.get("/api/tanks/retrieve_all_tanks")
+    revalidated = client.get("/api/tanks/retrieve_all_tanks", headers={"If-None-Match": response.headers["ETag"]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [tank["tank_id"] for tank in response.json()] == [1, 17]
+    assert response.headers["Cache-Control"] == "public, max-age=300"
+    assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == response.headers["ETag"]
+    max_queries(response, 0)
+
+
+def test_tank_etag(client: TestClient, tank_snapshot):
+    response = client.get("/api/tanks/tanks/17")
+    other = client.get("/api/tanks/tanks/1")
+    stale = client.get("/api/tanks/tanks/17", headers={"If-None-Match": other.headers["ETag"]})
+    missing = client.get("/api/tanks/tanks/999")
+
+    assert response.json()["name"] == "tank 17"
+    assert response.headers["ETag"] != other.headers["ETag"]
+    assert stale.status_code == status.HTTP_200_OK
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_tank_snapshot_follows_catalog(tmp_path, tank_session):
+    root = str(tmp_path)
+    general_df, premium_df, tanks_df = split_vehicles(make_vehicles())
+    write_snapshot({"general": general_df, "premium": premium_df, "tanks": tanks_df}, root)
+    cache = TankCatalogCache(root, engine=tank_session.get_bind())
+    first = cache.load(load_catalog(root, bootstrap=False))
+
+    general_df, premium_df, tanks_df = split_vehicles(make_vehicles(tier=9))
+    write_snapshot({"general": general_df, "premium": premium_df, "tanks": tanks_df}, root)
+
+    assert cache.get() is first
+    second = cache.refresh()
+    assert cache.get() is second
+    assert second.version != first.version
+    assert second.etag != first.etag
+    assert b'"tier":9' in second.payload
+    assert second.general_df.tier.tolist() == [9]
+    assert second.candidates.version != first.candidates.version
+    tank_session.expire_all()
+    assert TankService.get_tank_by_id(17, tank_session).tier == 9
@@ -44,3 +44,32 @@ def test_sign_out(client_common: TestClient, session: Session):
 
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"message": "Signed out successfully"}
+
+
+def test_principal_cache(client: TestClient, session: Session, max_queries):
+    UserService.create_user(User(user_id=901, is_admin=True), session)
+    UserService.create_user(User(user_id=902, is_admin=False), session)
+    app.state.principals.clear()
+
+    client.cookies.set("access_token", "902")
+    first = client.get("/api/users/get_user_history")
+    cached = client.get("/api/users/get_user_history")
+    denied = client.get("/api/users/get_all_users")
+
+    client.cookies.set("access_token", "901")
+    granted = client.post("/api/users/grant_admin", params={"user_id": 902})
+
+    client.cookies.set("access_token", "902")
+    allowed = client.get("/api/users/get_all_users")
+
+    assert first.headers["X-DB-Queries"] == "2"
+    assert max_queries(cached, 1) == 1
+    assert denied.status_code == status.HTTP_403_FORBIDDEN
+    assert granted.status_code == status.HTTP_200_OK
+    assert allowed.status_code == status.HTTP_200_OK
+
+
+def test_missing_token(client: TestClient):
+    response = client.get("/api/users/get_user_history")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
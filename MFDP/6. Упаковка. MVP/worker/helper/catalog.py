@@ -0,0 +1,214 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from helper.helper import fetch_vehicles, split_vehicles
+
+CATALOG_PATH = os.getenv("CATALOG_PATH") or "./catalog"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+TABLES = ["general", "premium", "tanks"]
+KEEP_VERSIONS = 3
+
+
+class Catalog:
+    """
+    Vehicle encyclopedia snapshot.
+
+    Attributes:
+        version (str): Snapshot version, <UTC time>-<hash prefix>
+        hash (str): SHA-256 of the snapshot contents
+        general_df (pd.DataFrame): General tanks, as split_vehicles returns them
+        premium_df (pd.DataFrame): Premium tanks
+        tanks_df (pd.DataFrame): Rows of the tanks table
+    """
+
+    def __init__(self, version: str, hash: str, tables: dict):
+        self.version = version
+        self.hash = hash
+        self.general_df = tables["general"]
+        self.premium_df = tables["premium"]
+        self.tanks_df = tables["tanks"]
+
+    def __iter__(self):
+        return iter((self.general_df, self.premium_df, self.tanks_df))
+
+
+def _write_table(frame, path: str, digest) -> list:
+    os.makedirs(path)
+    columns = []
+    for pos, col in enumerate(frame.columns):
+        values = frame[col]
+        spec = {"name": col, "file": f"{pos}.npy", "nulls": None}
+        if values.dtype == object:
+            nulls = values.isna().to_numpy()
+            array = np.array(values.where(~nulls, "").astype(str).tolist(), dtype=np.str_)
+            if nulls.any():
+                spec["nulls"] = f"{pos}.nulls.npy"
+                np.save(os.path.join(path, spec["nulls"]), nulls, allow_pickle=False)
+                digest.update(nulls.tobytes())
+        else:
+            array = values.to_numpy()
+        spec["dtype"] = array.dtype.str
+        np.save(os.path.join(path, spec["file"]), array, allow_pickle=False)
+        digest.update(f"{col}:{array.dtype.str};".encode())
+        digest.update(array.tobytes())
+        columns.append(spec)
+    return columns
+
+
+def _read_table(path: str, columns: list) -> pd.DataFrame:
+    data = {}
+    for spec in columns:
+        array = np.load(os.path.join(path, spec["file"]), mmap_mode="r")
+        if array.dtype.kind == "U":
+            values = array.astype(object)
+            if spec["nulls"]:
+                values[np.load(os.path.join(path, spec["nulls"]))] = None
+            data[spec["name"]] = values
+        else:
+            data[spec["name"]] = array
+    return pd.DataFrame(data, columns=[spec["name"] for spec in columns])
+
+
+def current_version(root: str = CATALOG_PATH) -> str | None:
+    path = os.path.join(root, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return file.read().strip() or None
+
+
+def read_manifest(root: str = CATALOG_PATH, version: str | None = None) -> dict | None:
+    version = version or current_version(root)
+    if version is None:
+        return None
+    with open(os.path.join(root, version, MANIFEST_FILE)) as file:
+        return json.load(file)
+
+
+def write_snapshot(tables: dict, root: str = CATALOG_PATH) -> str:
+    """
+    Write catalog frames as a new snapshot version and make it current.
+
+    Every column is one .npy file, so readers memory-map only what they use.
+    The version directory is renamed into place and CURRENT is replaced
+    atomically, so concurrent readers see either the old or the new snapshot.
+
+    Args:
+        tables: Table name -> frame, TABLES order.
+        root: Snapshot directory.
+
+    Returns:
+        str: Current version; unchanged if the contents equal the current snapshot
+    """
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    work_dir = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+    try:
+        manifest = {"tables": {}}
+        for name in TABLES:
+            manifest["tables"][name] = _write_table(tables[name], os.path.join(work_dir, name), digest)
+        manifest["hash"] = digest.hexdigest()
+
+        current = read_manifest(root)
+        if current is not None and current["hash"] == manifest["hash"]:
+            logger.info(f"Catalog is up to date, version {current['version']}")
+            return current["version"]
+
+        created_at = datetime.now(timezone.utc)
+        manifest["version"] = f"{created_at:%Y%m%dT%H%M%SZ}-{manifest['hash'][:8]}"
+        manifest["created_at"] = created_at.isoformat()
+        with open(os.path.join(work_dir, MANIFEST_FILE), "w") as file:
+            json.dump(manifest, file, indent=2)
+        os.rename(work_dir, os.path.join(root, manifest["version"]))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    current_tmp = os.path.join(root, f".{CURRENT_FILE}.tmp")
+    with open(current_tmp, "w") as file:
+        file.write(manifest["version"])
+    os.replace(current_tmp, os.path.join(root, CURRENT_FILE))
+    _prune(root, manifest["version"])
+    logger.info(f"Catalog snapshot {manifest['version']} written to {root}")
+    return manifest["version"]
+
+
+def _prune(root: str, current: str) -> None:
+    versions = sorted(name for name in os.listdir(root)
+                      if os.path.exists(os.path.join(root, name, MANIFEST_FILE)) and name != current)
+    for version in versions[:max(len(versions) - KEEP_VERSIONS + 1, 0)]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def refresh_catalog(root: str = CATALOG_PATH) -> str:
+    """
+    Download the encyclopedia and write it as a new snapshot if it changed.
+
+    Returns:
+        str: Current version
+    """
+    general_df, premium_df, tanks_df = split_vehicles(fetch_vehicles())
+    return write_snapshot({"general": general_df, "premium": premium_df, "tanks": tanks_df}, root)
+
+
+def load_catalog(root: str = CATALOG_PATH, bootstrap: bool = True) -> Catalog:
+    """
+    Memory-map the current catalog snapshot.
+
+    Args:
+        root: Snapshot directory.
+        bootstrap: Download the first snapshot if there is none. Processes
+            starting together wait for a single download.
+
+    Returns:
+        Catalog: Current snapshot
+    """
+    if current_version(root) is None:
+        if not bootstrap:
+            raise FileNotFoundError(f"No catalog snapshot in {root}, run `python -m helper.catalog refresh`")
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, LOCK_FILE), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if current_version(root) is None:
+                logger.info(f"No catalog snapshot in {root}, downloading")
+                refresh_catalog(root)
+
+    manifest = read_manifest(root)
+    path = os.path.join(root, manifest["version"])
+    tables = {name: _read_table(os.path.join(path, name), columns)
+              for name, columns in manifest["tables"].items()}
+    logger.info(f"Loaded catalog snapshot {manifest['version']}")
+    return Catalog(manifest["version"], manifest["hash"], tables)
+
+
+def main():
+    """
+    Обновление снимка каталога отдельным шагом:
+        python -m helper.catalog refresh
+        python -m helper.catalog show
+    """
+    parser = argparse.ArgumentParser(description="Vehicle encyclopedia snapshot")
+    parser.add_argument("command", choices=["refresh", "show"])
+    parser.add_argument("--path", default=CATALOG_PATH, help="Snapshot directory")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        print(refresh_catalog(args.path))
+    else:
+        manifest = read_manifest(args.path)
+        print(json.dumps({key: manifest[key] for key in ["version", "hash", "created_at"]} if manifest else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-import requests
+import json
 import os
+import numpy as np
 import pandas as pd
+from helper.http import ApiClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 APP_ID = os.getenv("APP_ID")
+BLITZ_API = ApiClient("https://papi.tanksblitz.ru/wotb")
 GENERAL_COLUMNS = ["tank_id", "nation", "tier", "type", "name", ]
 PREMIUM_COLUMNS = ["tank_id", "nation", "tier", "type", "name", "default_profile.firepower", "default_profile.hp",
                    "default_profile.hull_hp", "default_profile.hull_weight", "default_profile.maneuverability",
@@ -20,54 +28,173 @@ PREMIUM_COLUMNS = ["tank_id", "nation", "tier", "type", "name", "default_profile
                    "default_profile.suspension.traverse_speed", "default_profile.turret.hp",
                    "default_profile.turret.traverse_left_arc", "default_profile.turret.traverse_right_arc",
                    "default_profile.turret.traverse_speed", "default_profile.turret.view_range", ]
+DB_COLUMNS = ["tank_id", "name", "tier", "nation", "type", "is_premium", "image"]
+VEHICLE_FIELDS = ["tank_id", "name", "tier", "nation", "type", "is_premium"]
+USER_STATS_COLUMNS = ["spotted", "hits", "frags", "max_xp", "wins", "losses", "capture_points", "battles",
+                      "damage_dealt", "damage_received", "max_frags", "shots", "frags8p", "xp", "win_and_survived",
+                      "survived_battles", "dropped_capture_points"]
+USER_DATA_COLUMNS = ["user_id", "tank_id"] + USER_STATS_COLUMNS + ["battle_life_time", "mark_of_mastery"]
+MAX_ACCOUNTS_PER_CALL = 100
+TANK_DROP_IDS = [21793, 64769, 64273, 64801]
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+class BlitzApiError(Exception):
+    """Error response of the Blitz API: a non-200 status or a body with status other than "ok"."""
+
+
+def _loads(payload):
+    return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+
+def _check_status(response):
+    # ApiClient не бросает исключение на 429/5xx, оставшиеся после повторов
+    if response.status_code != 200:
+        raise BlitzApiError(f"HTTP {response.status_code}: {response.content[:200]!r}")
+
+
+def _api_data(body):
+    if not isinstance(body, dict) or body.get("status") != "ok":
+        error = body.get("error") if isinstance(body, dict) else body
+        raise BlitzApiError(f"API error: {error}")
+    return body.get("data") or {}
+
+
+def fetch_vehicles():
+    response = BLITZ_API.get("/encyclopedia/vehicles/", params={"application_id": APP_ID})
+    _check_status(response)
+    return _api_data(_loads(response.content))
+
+
+def split_vehicles(data):
+    """
+    Flatten the encyclopedia/vehicles payload into the catalog frames.
+
+    Only the catalog fields are taken from every vehicle: the top-level
+    scalars, images.preview (as image) and default_profile, which pd.json_normalize
+    flattens in one pass into dotted columns (default_profile.armor.hull.front, ...).
+    Keyed dicts such as modules_tree or next_tanks are never normalized.
+
+    Args:
+        data: "data" object of the response, tank_id -> vehicle.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]: General tanks (GENERAL_COLUMNS),
+            premium tanks (PREMIUM_COLUMNS) and tanks table rows (DB_COLUMNS)
+    """
+    records = [{**{col: vehicle.get(col) for col in VEHICLE_FIELDS},
+                "image": (vehicle.get("images") or {}).get("preview"),
+                "default_profile": vehicle.get("default_profile") or {}}
+               for vehicle in data.values()]
+    vehicles = pd.json_normalize(records)
+    for col in dict.fromkeys(PREMIUM_COLUMNS + DB_COLUMNS):
+        if col not in vehicles.columns:
+            vehicles[col] = None
+    is_premium = vehicles["is_premium"].fillna(False).astype(bool).to_numpy()
+
+    general_df = vehicles.loc[~is_premium, GENERAL_COLUMNS].reset_index(drop=True)
+    premium_df = vehicles.loc[is_premium, PREMIUM_COLUMNS].reset_index(drop=True)
+    db_tanks_df = vehicles[DB_COLUMNS]
+    premium_df = premium_df[~premium_df.tank_id.isin(TANK_DROP_IDS)]
+
+    return general_df, premium_df, db_tanks_df
 
 
 def get_tanks_data():
-    general_data = []
-    premium_data = []
-    url = f"https://papi.tanksblitz.ru/wotb/encyclopedia/vehicles/?application_id={APP_ID}"
-    response = requests.get(url)
-    for i in response.json().get("data").values():
-        if i.get("is_premium"):
-            temp_data = {}
-            for col in PREMIUM_COLUMNS:
-                temp = i
-                splitted_col = col.split(".")
-                for part_col in splitted_col:
-                    temp = temp.get(part_col)
-                temp_data[col] = temp
-            premium_data.append(temp_data)
-        else:
-            temp = {k: v for k, v in i.items() if k in GENERAL_COLUMNS}
-            general_data.append(temp)
-    general_df = pd.DataFrame(general_data, columns=GENERAL_COLUMNS)
-    premium_df = pd.DataFrame(premium_data, columns=PREMIUM_COLUMNS)
-    tank_drop_ids = [21793, 64769, 64273, 64801]
-    premium_df = premium_df[~premium_df.tank_id.isin(tank_drop_ids)]
-
-    return general_df, premium_df
+    return split_vehicles(fetch_vehicles())[:2]
+
+
+def parse_user_data(payload, user_id):
+    """
+    Decode a tanks/stats response into the per-tank stats frame in one pass.
+
+    Values are collected column by column and converted to typed arrays once:
+    ID columns and mark_of_mastery stay int64 (categorical schema of the model),
+    stats become int32, or float32 with NaN where the API omitted a value.
+
+    Args:
+        payload: Raw response body (bytes or str).
+        user_id: Account ID.
+
+    Returns:
+        pd.DataFrame: USER_DATA_COLUMNS, one row per tank; empty if the account has no stats
+    """
+    return parse_users_data(payload, [user_id])[user_id]
+
+
+def parse_users_data(payload, user_ids):
+    """
+    Decode a multi-account tanks/stats response once and split it per account.
+
+    Args:
+        payload: Raw response body (bytes or str).
+        user_ids: Requested account IDs.
+
+    Returns:
+        dict: user_id -> parse_user_data frame
+
+    Raises:
+        BlitzApiError: If the response body is an API error
+    """
+    data = _api_data(_loads(payload))
+    return {user_id: _account_frame(data.get(f"{user_id}") or [], user_id) for user_id in user_ids}
+
+
+def _account_frame(tanks, user_id):
+    values = {col: [] for col in USER_STATS_COLUMNS}
+    tank_ids, life_time, mastery = [], [], []
+    for el in tanks:
+        tank_ids.append(el.get("tank_id"))
+        life_time.append(el.get("battle_life_time"))
+        mastery.append(el.get("mark_of_mastery"))
+        stats = el.get("all") or {}
+        for col, column_values in values.items():
+            column_values.append(stats.get(col))
+    values["battle_life_time"] = life_time
+
+    columns = {"user_id": np.full(len(tanks), user_id, dtype=np.int64),
+               "tank_id": np.array(tank_ids, dtype=np.int64)}
+    for col, column_values in values.items():
+        columns[col] = _stat_array(column_values)
+    columns["mark_of_mastery"] = np.array([np.nan if value is None else value for value in mastery],
+                                          dtype=np.int64 if None not in mastery else np.float64)
+    return pd.DataFrame(columns, columns=USER_DATA_COLUMNS, copy=False)
+
+
+def _stat_array(values):
+    if None in values:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+    array = np.array(values, dtype=np.int64)
+    if len(array) and (array.min() < INT32_MIN or array.max() > INT32_MAX):
+        return array
+    return array.astype(np.int32)
 
 
 def get_user_data(user_id):
-    columns = ["user_id", "tank_id"]
-    user_tanks_columns = ["spotted", "hits", "frags", "max_xp", "wins", "losses", "capture_points", "battles",
-                          "damage_dealt", "damage_received", "max_frags", "shots", "frags8p", "xp", "win_and_survived",
-                          "survived_battles", "dropped_capture_points"]
-    tanks_columns = ["battle_life_time", "mark_of_mastery"]
-    columns = columns + user_tanks_columns + tanks_columns
-
-    user_df = pd.DataFrame()
-    url = f"https://papi.tanksblitz.ru/wotb/tanks/stats/?application_id={APP_ID}&account_id={user_id}"
-    data = requests.get(url).json()
-    data = data.get("data").get(f"{user_id}")
-    if data != None:
-        for el in data:
-            full_data = {"user_id": [user_id]}
-            full_data["tank_id"] = el.get("tank_id")
-            full_data["battle_life_time"] = [el.get("battle_life_time")]
-            full_data["mark_of_mastery"] = [el.get("mark_of_mastery")]
-            for k, v in el.get("all").items():
-                full_data[k] = [v]
-            temp_df = pd.DataFrame(full_data, columns=columns)
-            user_df = pd.concat([user_df, temp_df], ignore_index=True)
-    return user_df
+    response = BLITZ_API.get("/tanks/stats/", params={"application_id": APP_ID, "account_id": user_id})
+    _check_status(response)
+    return parse_user_data(response.content, user_id)
+
+
+def get_users_data(user_ids):
+    """
+    Fetch stats of several accounts with one tanks/stats call per MAX_ACCOUNTS_PER_CALL accounts.
+
+    Args:
+        user_ids: Account IDs, duplicates are fetched once.
+
+    Returns:
+        dict: user_id -> get_user_data frame
+
+    Raises:
+        BlitzApiError: If a request failed; a failed fetch never yields empty stats
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    users_data = {}
+    for start in range(0, len(user_ids), MAX_ACCOUNTS_PER_CALL):
+        chunk = user_ids[start:start + MAX_ACCOUNTS_PER_CALL]
+        response = BLITZ_API.get("/tanks/stats/", params={"application_id": APP_ID,
+                                                         "account_id": ",".join(map(str, chunk))})
+        _check_status(response)
+        users_data.update(parse_users_data(response.content, chunk))
+    return users_data
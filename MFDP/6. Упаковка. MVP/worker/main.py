@@ -1,17 +1,33 @@
 import pika
+import requests
 from loguru import logger
 import os
 import json
-from helper.helper import get_tanks_data
-from ml.prediction import predict
-import requests
-from autogluon.tabular import TabularPredictor
+from helper.helper import get_users_data, MAX_ACCOUNTS_PER_CALL
+from helper.catalog import current_version, load_catalog
+from ml.prediction import predict, predict_many, CandidateBlock
+from ml.registry import PredictorRegistry
+from ml.cache import ResultCache
+from helper.http import ApiClient
 
 RABBIT_HOST = os.getenv("RABBIT_HOST")
 RABBIT_PORT = os.getenv("RABBIT_PORT")
 PIKA_USERNAME = os.getenv("RABBITMQ_DEFAULT_USER")
 PIKA_PASSWORD = os.getenv("RABBITMQ_DEFAULT_PASS")
+# Микробатчинг: задачи копятся до FETCH_BATCH_SIZE штук или FETCH_WINDOW_MS мс и оцениваются одним вызовом модели
+FETCH_WINDOW_MS = int(os.getenv("FETCH_WINDOW_MS") or 50)
+FETCH_BATCH_SIZE = min(int(os.getenv("FETCH_BATCH_SIZE") or MAX_ACCOUNTS_PER_CALL), MAX_ACCOUNTS_PER_CALL)
+RABBIT_PREFETCH = max(int(os.getenv("RABBIT_PREFETCH") or FETCH_BATCH_SIZE), FETCH_BATCH_SIZE)
 API_ENDPOINT = os.getenv("API_ENDPOINT")
+DEFAULT_MODEL_PATH = os.getenv("DEFAULT_MODEL_PATH") or "./ml/AutogluonModels/ag-20251205_150250"
+PREDICTOR_CACHE_SIZE = int(os.getenv("PREDICTOR_CACHE_SIZE") or 2)
+PREDICTOR_CACHE_MAX_MB = int(os.getenv("PREDICTOR_CACHE_MAX_MB") or 0)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL") or 600)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE") or 10000)
+RESULT_CACHE_URL = os.getenv("RESULT_CACHE_URL")
+# Ответы API, после которых пачку стоит повторить; остальные ошибки постоянные
+TRANSIENT_STATUSES = (429, 502, 503, 504)
+SEND_OK, SEND_RETRY, SEND_FAILED = "ok", "retry", "failed"
 
 connection_params = pika.ConnectionParameters(
     host=RABBIT_HOST,  # Адрес RabbitMQ сервера
@@ -25,36 +41,209 @@ connection_params = pika.ConnectionParameters(
     blocked_connection_timeout=2
 )
 
+# Каталог читается из общего снимка (python -m helper.catalog refresh), а не скачивается каждой репликой
+catalog = load_catalog()
+general_df, premium_df = catalog.general_df, catalog.premium_df
+candidates = CandidateBlock(premium_df)
+
+
+def refresh_catalog():
+    """Swap in the current catalog snapshot if `python -m helper.catalog refresh` wrote a new version."""
+    global catalog, general_df, premium_df, candidates
+    version = current_version()
+    if version is None or version == catalog.version:
+        return
+    try:
+        new_catalog = load_catalog(bootstrap=False)
+        new_candidates = CandidateBlock(new_catalog.premium_df)
+    except Exception as e:
+        logger.error(f"Failed to load catalog {version}, keeping {catalog.version}: {e}")
+        return
+    catalog, general_df, premium_df, candidates = (new_catalog, new_catalog.general_df, new_catalog.premium_df,
+                                                   new_candidates)
+    logger.info(f"Catalog {catalog.version} loaded")
+
+# Загружаем модель до подключения к очереди, чтобы первая задача не ждала десериализацию
+registry = PredictorRegistry(max_items=PREDICTOR_CACHE_SIZE,
+                             max_bytes=PREDICTOR_CACHE_MAX_MB * 2 ** 20 or None)
+registry.warm(DEFAULT_MODEL_PATH)
+results = ResultCache(ttl=RESULT_CACHE_TTL, max_items=RESULT_CACHE_SIZE, shared_url=RESULT_CACHE_URL)
+
 connection = pika.BlockingConnection(connection_params)
 channel = connection.channel()
 queue_name = 'ml_task_queue'
 channel.queue_declare(queue=queue_name)  # Создание очереди (если не существует)
+channel.basic_qos(prefetch_count=RABBIT_PREFETCH)  # Чтобы за окно накопилось до FETCH_BATCH_SIZE сообщений
+
+# Сообщения (delivery_tag, задача, redelivered), ожидающие общего запроса статистики, и таймер окна
+pending = []
+flush_timer = None
 
-general_df, premium_df = get_tanks_data()
 
+api = ApiClient(API_ENDPOINT, timeout=(3.05, 5))
 
-def send_result(result: dict):
+
+def send_result(result: dict) -> str:
+    """
+    Post results to the API.
+
+    Returns:
+        str: SEND_OK; SEND_RETRY if the API is unreachable or answered with a
+            TRANSIENT_STATUSES code; SEND_FAILED for any other error
+    """
     try:
-        response = requests.post(API_ENDPOINT, json=result, timeout=5)
-        return {"message": "Task result sent successfully!"}
+        response = api.post(json=result)
+    except requests.RequestException as e:
+        logger.error(f"Failed to send result to API: {e}")
+        return SEND_RETRY
     except Exception as e:
         logger.error(f"Failed to send result to API: {e}")
+        return SEND_FAILED
+    if response.ok:
+        return SEND_OK
+    logger.error(f"API rejected results: {response.status_code} {response.text[:500]}")
+    return SEND_RETRY if response.status_code in TRANSIENT_STATUSES else SEND_FAILED
+
+
+def result_body(body, result) -> dict:
+    body["result"] = [
+        {"prediction_id": body.get("prediction_id"), "rank": enum + 1, "tank_id": el.tank_id,
+         "predicted_damage": round(el.preds)} for enum, el in enumerate(result.itertuples())]
+    return body
+
+
+def score(batch, user_data):
+    """
+    Score a batch of tasks, one predict_many call per model.
+
+    If a model call fails, its tasks are scored one by one, so a broken
+    message fails alone.
+
+    Returns:
+        tuple: (delivery_tag, result body) of scored tasks, delivery tags of failed tasks
+    """
+    by_model = {}
+    for delivery_tag, body in batch:
+        by_model.setdefault(body.get("model_path") or DEFAULT_MODEL_PATH, []).append((delivery_tag, body))
+
+    done, failed = [], []
+    for model_path, tasks in by_model.items():
+        try:
+            model = registry.get(model_path)
+        except Exception as e:
+            logger.error(f"Failed to load model {model_path}: {e}")
+            failed.extend(delivery_tag for delivery_tag, _ in tasks)
+            continue
+        try:
+            scores = predict_many(model, [body.get("user_id") for _, body in tasks], general_df, candidates,
+                                  user_data=user_data, cache=results, model_key=model_path)
+            done.extend((delivery_tag, result_body(body, scores[body.get("user_id")])) for delivery_tag, body in tasks)
+        except Exception as e:
+            logger.error(f"Batch of {len(tasks)} tasks failed, scoring one by one: {e}")
+            for delivery_tag, body in tasks:
+                try:
+                    result = predict(model, body.get("user_id"), general_df, candidates, cache=results,
+                                     model_key=model_path, user_data=user_data)
+                    done.append((delivery_tag, result_body(body, result)))
+                except Exception as e:
+                    logger.error(f"Task {body} failed: {e}")
+                    failed.append(delivery_tag)
+    return done, failed
+
+
+def send_batch(done):
+    """
+    Send the results of a batch in one request.
+
+    If the API rejects the batch for good (e.g. a prediction deleted by an
+    admin), the results are sent one by one, so only the bad ones fail.
+
+    Returns:
+        tuple: Delivery tags of sent, transiently failed and failed results
+    """
+    # Результаты пачки отправляются одним запросом: API пишет их одной транзакцией
+    status = send_result({"results": [body for _, body in done]})
+    if status == SEND_FAILED and len(done) > 1:
+        logger.warning(f"API rejected a batch of {len(done)} results, sending one by one")
+        statuses = [(delivery_tag, send_result({"results": [body]})) for delivery_tag, body in done]
+    else:
+        statuses = [(delivery_tag, status) for delivery_tag, _ in done]
+    return tuple([delivery_tag for delivery_tag, s in statuses if s == expected]
+                 for expected in (SEND_OK, SEND_RETRY, SEND_FAILED))
+
+
+def settle(sent, retry, failed, redelivered):
+    """
+    Settle the deliveries of a processed batch.
+
+    Failed messages are rejected (dead-lettered, if the queue has a policy
+    for it). Transient failures are requeued once: a message that comes back
+    redelivered and fails again is rejected too. Sent messages are acked with
+    one multiple ack after everything else is settled.
+    """
+    for delivery_tag in failed:
+        channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+    for delivery_tag in retry:
+        if delivery_tag in redelivered:
+            logger.error(f"Delivery {delivery_tag} failed again after a redelivery, rejecting it")
+        channel.basic_nack(delivery_tag=delivery_tag, requeue=delivery_tag not in redelivered)
+    if sent:
+        # Все более ранние сообщения уже подтверждены или отклонены: одно подтверждение на всю пачку
+        channel.basic_ack(delivery_tag=max(sent), multiple=True)
+
+
+def flush():
+    """
+    Process all pending messages as one batch.
+
+    Stats of the accounts are fetched with one request, the batch is scored
+    with one model call, the results are sent to the API in one request and
+    the deliveries are acked together. Failed messages are rejected; if the
+    API is unavailable, the batch is requeued once.
+    """
+    global flush_timer
+    if flush_timer is not None:
+        connection.remove_timeout(flush_timer)
+        flush_timer = None
+    redelivered = {delivery_tag for delivery_tag, _, again in pending if again}
+    batch = [(delivery_tag, body) for delivery_tag, body, _ in pending]
+    pending.clear()
+    refresh_catalog()
+
+    try:
+        user_data = get_users_data([body.get("user_id") for _, body in batch])
+    except Exception as e:
+        logger.error(f"Failed to fetch stats of {len(batch)} accounts, fetching one by one: {e}")
+        user_data = {}
+    logger.info(f"Fetched stats of {len(user_data)} accounts for {len(batch)} tasks")
+
+    done, failed = score(batch, user_data)
+    sent, retry, rejected = send_batch(done) if done else ([], [], [])
+    settle(sent, retry, failed + rejected, redelivered)
+    logger.info(f"Batch of {len(batch)} tasks: {len(sent)} done, {len(retry)} retried, "
+                f"{len(failed) + len(rejected)} failed")
+
+
+def on_window():
+    global flush_timer
+    flush_timer = None
+    flush()
 
 
 # Функция, которая будет вызвана при получении сообщения
 def callback(ch, method, properties, body):
+    global flush_timer
     logger.info(f"Received: '{body}'")
-    body = json.loads(body)
-    model = TabularPredictor.load(body.get("model_path"))
-    result = predict(model, body.get("user_id"), general_df, premium_df)
-    event_data = {"result": [
-        {"prediction_id": body.get("prediction_id"), "rank": enum + 1, "tank_id": el.tank_id, "predicted_damage": el.preds} for
-        enum, el in enumerate(result.itertuples())]}
-    body.update(event_data)
-    logger.info(body)
-    send_result(body)
-
-    ch.basic_ack(delivery_tag=method.delivery_tag)  # Ручное подтверждение обработки сообщения
+    try:
+        pending.append((method.delivery_tag, json.loads(body), method.redelivered))
+    except ValueError as e:
+        logger.error(f"Malformed task {body}: {e}")
+        channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+        return
+    if len(pending) >= FETCH_BATCH_SIZE:
+        flush()
+    elif flush_timer is None:
+        flush_timer = connection.call_later(FETCH_WINDOW_MS / 1000, on_window)
 
 
 # Подписка на очередь и установка обработчика сообщений
@@ -0,0 +1,177 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psutil
+from autogluon.tabular import TabularPredictor
+from loguru import logger
+
+VARIANTS = ["best", "refit", "fast"]
+REPORT_FILE = "export_report.json"
+
+
+def load_sample(path: str) -> pd.DataFrame:
+    """
+    Load a benchmark batch of model features (preprocessing output without ID_COLUMNS).
+
+    Pickle and parquet keep the categorical dtypes the predictor was trained on.
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def latency_stats(timings) -> dict:
+    timings = np.asarray(timings) * 1000
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+
+def time_predict(predictor, X, model=None, repeats: int = 50) -> dict:
+    predictor.predict(X, model=model)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictor.predict(X, model=model)
+        timings.append(time.perf_counter() - start)
+    return latency_stats(timings)
+
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def measure(path: str, X=None, repeats: int = 50) -> dict:
+    """
+    Serving footprint of a saved predictor, loaded the way PredictorRegistry loads it.
+
+    Args:
+        path: Predictor directory.
+        X: Benchmark batch, latency is not measured if None.
+        repeats: Number of timed predict calls.
+
+    Returns:
+        dict: load_s, disk_bytes, rss_bytes, models and p50_ms/p99_ms of predict
+    """
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    start = time.perf_counter()
+    predictor = TabularPredictor.load(path)
+    models = predictor.persist()
+    stats = {"path": path, "load_s": time.perf_counter() - start, "disk_bytes": dir_size(path),
+             "rss_bytes": max(process.memory_info().rss - rss, 0), "models": models,
+             "p50_ms": None, "p99_ms": None}
+    if X is not None:
+        stats.update(time_predict(predictor, X, repeats=repeats))
+    return stats
+
+
+def measure_isolated(path: str, X=None, repeats: int = 50) -> dict:
+    # Отдельный процесс, чтобы память и кэши других вариантов не влияли на замеры
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure, path, X, repeats).result()
+
+
+def fastest_within(predictor, X, max_latency_ms: float, repeats: int = 50) -> str:
+    """
+    Pick the model with the best validation score whose p99 predict latency fits the budget.
+
+    Args:
+        predictor: Loaded source predictor.
+        X: Benchmark batch.
+        max_latency_ms: Latency budget of one predict call on X.
+        repeats: Number of timed predict calls per model.
+
+    Returns:
+        str: Model name
+    """
+    leaderboard = predictor.leaderboard().sort_values("score_val", ascending=False)
+    for model in leaderboard["model"]:
+        predictor.persist(models=[model])
+        stats = time_predict(predictor, X, model=model, repeats=repeats)
+        predictor.unpersist()
+        logger.info(f"{model}: p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+        if stats["p99_ms"] <= max_latency_ms:
+            return model
+    raise ValueError(f"No model predicts {len(X)} rows within {max_latency_ms} ms")
+
+
+def export(source: str, output: str, variants=("best",), X=None, max_latency_ms: float | None = None,
+           repeats: int = 50) -> dict:
+    """
+    Export slim inference artifacts of a trained predictor.
+
+    Every variant is a clone_for_deployment copy that keeps only the serving
+    model and its ancestors:
+        best - the best model of the training run as is;
+        refit - the best model refit on all data (refit_full), no bagging folds;
+        fast - the best model whose p99 latency on X fits max_latency_ms.
+
+    Args:
+        source: Training directory of the predictor.
+        output: Directory for the artifacts, one subdirectory per variant.
+        variants: Variants to export.
+        X: Benchmark batch for latency measurement and the fast variant.
+        max_latency_ms: Latency budget of the fast variant.
+        repeats: Number of timed predict calls.
+
+    Returns:
+        dict: Report with footprint of the source and every exported variant
+    """
+    if "fast" in variants and (X is None or max_latency_ms is None):
+        raise ValueError("The fast variant requires benchmark data and max_latency_ms")
+    os.makedirs(output, exist_ok=True)
+    predictor = TabularPredictor.load(source)
+
+    report = {"source": measure_isolated(source, X, repeats), "variants": {}}
+    for variant in variants:
+        path = os.path.join(output, variant)
+        if variant == "best":
+            predictor.clone_for_deployment(path, model="best")
+        elif variant == "refit":
+            with tempfile.TemporaryDirectory(dir=output) as work_dir:
+                work = predictor.clone(os.path.join(work_dir, "predictor"), return_clone=True)
+                work.refit_full(model="best")
+                work.clone_for_deployment(path, model="best")
+        elif variant == "fast":
+            predictor.clone_for_deployment(path, model=fastest_within(predictor, X, max_latency_ms, repeats))
+        else:
+            raise ValueError(f"Unknown variant {variant}, expected one of {VARIANTS}")
+
+        report["variants"][variant] = measure_isolated(path, X, repeats)
+        logger.info(f"Exported {variant}: {report['variants'][variant]}")
+
+    with open(os.path.join(output, REPORT_FILE), "w") as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+def main():
+    """
+    Пример:
+        python -m ml.export ./ml/AutogluonModels/ag-20251205_150250 ./ml/AutogluonModels/deploy \
+            --variants best refit fast --data sample.pkl --max-latency-ms 50
+
+    Экспортированный вариант регистрируется через POST /api/models/new_model
+    с полем artifact_path.
+    """
+    parser = argparse.ArgumentParser(description="Export deployment artifacts of an AutoGluon predictor")
+    parser.add_argument("source", help="Training directory of the predictor")
+    parser.add_argument("output", help="Directory for the exported artifacts")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=["best"])
+    parser.add_argument("--data", help="Benchmark batch of model features (.pkl or .parquet)")
+    parser.add_argument("--max-latency-ms", type=float, help="p99 latency budget of the fast variant")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    X = load_sample(args.data) if args.data else None
+    export(args.source, args.output, args.variants, X, args.max_latency_ms, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
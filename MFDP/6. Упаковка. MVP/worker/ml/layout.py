@@ -0,0 +1,123 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+
+ID_COLUMNS = ["user_id", "tank_id"]
+PREMIUM_CAT_COLUMNS = ["nation", "tier", "type"]
+NOT_AVG_COLUMNS = ["max_xp", "battles", "max_frags", "mark_of_mastery"]
+
+
+def is_categorical(col: str) -> bool:
+    return "mark_of_mastery" in col or col in PREMIUM_CAT_COLUMNS
+
+
+class LayoutPlan:
+    """
+    Compiled layout of the model feature vector.
+
+    Maps every PREDICTION_COLUMNS feature to its integer slot once, so that
+    feature assembly at serving time is pure integer indexing. The same plan
+    is used by training code to split and scale features.
+
+    Attributes:
+        columns (list): Ordered model feature names
+        slots (dict): Feature name -> slot in columns
+        num_slots (np.ndarray): Slots of numeric (scaled) features
+        cat_slots (np.ndarray): Slots of categorical features
+        means (np.ndarray): Scaling means, aligned with num_slots
+        stds (np.ndarray): Scaling stds, aligned with num_slots
+        mastery_slots (np.ndarray): Slots of mark_of_mastery_<tank_id> features
+        user_stats (list): Per-tank user stats present in the layout
+        user_avg_stats (np.ndarray): Which of user_stats are averaged by battles
+        user_tank_ids (np.ndarray): Sorted general tank IDs present in the layout
+        user_slot_matrix (np.ndarray): Slot of <stat>_<tank_id>, shape (tanks, stats), -1 if absent
+        profile_columns (list): default_profile.* features of premium tanks
+        profile_num_pos (np.ndarray): Positions of profile_columns among num_slots
+        profile_means (np.ndarray): Scaling means of profile_columns
+        profile_stds (np.ndarray): Scaling stds of profile_columns
+        frame_order (np.ndarray): Permutation of a [ID_COLUMNS, numeric, categorical] frame into
+            ID_COLUMNS + columns order
+    """
+
+    def __init__(self, columns, means, stds):
+        self.columns = list(columns)
+        self.slots = {col: slot for slot, col in enumerate(self.columns)}
+        is_cat = np.array([is_categorical(col) for col in self.columns])
+        self.num_slots = np.flatnonzero(~is_cat)
+        self.cat_slots = np.flatnonzero(is_cat)
+        self.num_columns = [self.columns[slot] for slot in self.num_slots]
+        self.cat_columns = [self.columns[slot] for slot in self.cat_slots]
+
+        self.means = np.asarray(means)
+        self.stds = np.asarray(stds)
+        if self.means.shape != self.num_slots.shape or self.stds.shape != self.num_slots.shape:
+            raise ValueError(f"Scaling artifacts cover {self.means.shape[0]} features, "
+                             f"layout has {len(self.num_slots)} numeric features.")
+
+        self.mastery_slots = np.array([slot for slot in self.cat_slots if "mark_of_mastery" in self.columns[slot]],
+                                      dtype=np.int64)
+
+        user_features = {}
+        for slot, col in enumerate(self.columns):
+            stat, _, tank_id = col.rpartition("_")
+            if stat and tank_id.isdigit():
+                user_features[(stat, int(tank_id))] = slot
+        self.user_stats = list(dict.fromkeys(stat for stat, _ in user_features))
+        self.user_avg_stats = np.array([stat not in NOT_AVG_COLUMNS for stat in self.user_stats], dtype=bool)
+        self.user_tank_ids = np.unique(np.array([tank_id for _, tank_id in user_features], dtype=np.int64))
+        self.user_slot_matrix = np.full((len(self.user_tank_ids), len(self.user_stats)), -1, dtype=np.int64)
+        stat_pos = {stat: pos for pos, stat in enumerate(self.user_stats)}
+        for (stat, tank_id), slot in user_features.items():
+            self.user_slot_matrix[np.searchsorted(self.user_tank_ids, tank_id), stat_pos[stat]] = slot
+
+        self.profile_columns = [col for col in self.columns if "default_profile" in col]
+        profile_slots = np.array([self.slots[col] for col in self.profile_columns], dtype=np.int64)
+        self.profile_num_pos = np.searchsorted(self.num_slots, profile_slots)
+        self.profile_means = self.means[self.profile_num_pos]
+        self.profile_stds = self.stds[self.profile_num_pos]
+
+        self.frame_order = np.concatenate([np.arange(len(ID_COLUMNS)), len(ID_COLUMNS) + np.argsort(
+            np.concatenate([self.num_slots, self.cat_slots]))])
+
+    def __len__(self):
+        return len(self.columns)
+
+    @classmethod
+    def load(cls, path: str = "./ml"):
+        """
+        Compile the plan from columns.joblib, means.joblib and stds.joblib.
+
+        Args:
+            path: Directory with the artifacts.
+
+        Returns:
+            LayoutPlan: Compiled plan
+        """
+        return cls(joblib.load(os.path.join(path, "columns.joblib")),
+                   joblib.load(os.path.join(path, "means.joblib")),
+                   joblib.load(os.path.join(path, "stds.joblib")))
+
+    @classmethod
+    def fit(cls, X):
+        """
+        Compile the plan from a training feature frame.
+
+        Args:
+            X: Training features in model order, without ID_COLUMNS.
+
+        Returns:
+            LayoutPlan: Plan with means and stds of the numeric features
+        """
+        columns = [col for col in X.columns if col not in ID_COLUMNS]
+        num_columns = [col for col in columns if not is_categorical(col)]
+        values = X[num_columns].to_numpy()
+        means = np.nanmean(values, axis=0)
+        stds = np.nanstd(values, axis=0)
+        stds[stds == 0] = 1.0
+        return cls(columns, means, stds)
+
+    def dump(self, path: str = "./ml") -> None:
+        joblib.dump(pd.Index(self.columns), os.path.join(path, "columns.joblib"))
+        joblib.dump(self.means, os.path.join(path, "means.joblib"))
+        joblib.dump(self.stds, os.path.join(path, "stds.joblib"))
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from autogluon.tabular import TabularPredictor
+from loguru import logger
+from ml.export import dir_size
+
+ARTIFACT_FILES = ["predictor.pkl", "learner.pkl", os.path.join("models", "trainer.pkl")]
+
+
+def artifact_checksum(path: str) -> str:
+    """
+    Content fingerprint of a saved predictor.
+
+    AutoGluon rewrites its top-level pickles on every save, so their contents
+    identify the artifact without reading the models. A file is hashed again
+    only when its stat changes; ctime is part of the stat and cannot be
+    preserved by `cp -p` or rsync, so a replaced file is always re-read.
+
+    Args:
+        path: Predictor directory.
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha1()
+    for name in ARTIFACT_FILES:
+        file_path = os.path.join(path, name)
+        if os.path.exists(file_path):
+            digest.update(f"{name}:{_file_digest(file_path)};".encode())
+    return digest.hexdigest()
+
+
+_file_digests = {}
+
+
+def persisted_size(predictor, models) -> int:
+    """
+    Memory of persisted models: the size AutoGluon recorded for each model at fit time.
+
+    Falls back to the on-disk size of a model where it is unknown. Unlike an
+    RSS delta, it does not depend on what other threads allocate meanwhile.
+    """
+    size = 0
+    for name in models:
+        try:
+            memory = predictor.model_info(name).get("memory_size")
+        except Exception:
+            memory = None
+        size += memory or dir_size(os.path.join(predictor.path, "models", name))
+    return size
+
+
+def _file_digest(file_path: str) -> str:
+    stat = os.stat(file_path)
+    stamp = (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+    cached = _file_digests.get(file_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(file_path, "rb") as file:
+        value = hashlib.file_digest(file, "sha1").hexdigest()
+    _file_digests[file_path] = (stamp, value)
+    return value
+
+
+class PredictorRegistry:
+    """
+    Process-level LRU of loaded predictors.
+
+    Predictors are keyed by a model key (the model path unless given) and the
+    artifact checksum, so an artifact rewritten in place is loaded again instead
+    of being served stale. Each predictor is loaded once: concurrent requests
+    for the same key wait for a single load and get the same instance. The best
+    model and its ensemble members are persisted in memory right after loading,
+    so predict() doesn't read sub-models from disk. The least recently used
+    predictors are dropped once the registry holds more than max_items
+    predictors or more than max_bytes of persisted models (persisted_size).
+    An evicted predictor is not unpersisted: requests still predicting with it
+    keep their reference, and its memory is freed when the last one finishes.
+
+    Attributes:
+        max_items (int): Maximum number of loaded predictors
+        max_bytes (int): Memory budget of loaded predictors, unlimited if None
+        hits (int): Lookups served from memory
+        misses (int): Lookups that loaded a predictor
+    """
+
+    def __init__(self, max_items: int = 2, max_bytes: int | None = None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._predictors = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._predictors)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(size for _, size in self._predictors.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "loaded": len(self._predictors),
+                    "size_bytes": self.size_bytes}
+
+    def get(self, path: str, key=None) -> TabularPredictor:
+        key = (os.path.abspath(path) if key is None else key, artifact_checksum(path))
+        with self._lock:
+            predictor = self._lookup(key)
+            if predictor is not None:
+                return predictor
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                predictor = self._lookup(key)
+                if predictor is not None:
+                    return predictor
+            entry = self._load(path)
+            with self._lock:
+                self.misses += 1
+                for stale in [other for other in self._predictors if other[0] == key[0]]:
+                    self._drop(stale)
+                self._predictors[key] = entry
+                self._evict()
+                self._loading.pop(key, None)
+            return entry[0]
+
+    def warm(self, path: str, key=None) -> None:
+        self.get(path, key)
+
+    def _lookup(self, key):
+        entry = self._predictors.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        self._predictors.move_to_end(key)
+        return entry[0]
+
+    def _load(self, path: str):
+        start = time.perf_counter()
+        predictor = TabularPredictor.load(path)
+        persisted = predictor.persist()
+        size = persisted_size(predictor, persisted)
+        logger.info(f"Loaded predictor {path} in {time.perf_counter() - start:.2f}s, "
+                    f"persisted {len(persisted)} models, {size / 2 ** 20:.0f} MiB")
+        return predictor, size
+
+    def _evict(self) -> None:
+        while len(self._predictors) > 1 and (
+                len(self._predictors) > self.max_items
+                or (self.max_bytes is not None and self.size_bytes > self.max_bytes)):
+            self._drop(next(iter(self._predictors)))
+
+    def _drop(self, key) -> None:
+        # Без unpersist: другой поток может ещё предсказывать этим предиктором
+        _, size = self._predictors.pop(key)
+        logger.info(f"Evicted predictor {key[0]} ({size / 2 ** 20:.0f} MiB)")
@@ -7,6 +7,7 @@ from routes.balance import balance_router
 from routes.model import model_router
 from database.database import init_db
 from database.config import get_settings
+from services.rm.rm import publisher
 import uvicorn
 from loguru import logger
 
@@ -66,6 +67,7 @@ def on_startup():
 async def shutdown_event():
     """Cleanup on application shutdown."""
     logger.info("Application shutting down...")
+    publisher.close()
 
 
 if __name__ == '__main__':
@@ -12,6 +12,7 @@ from services.rm.rm import send_task
 from loguru import logger
 from routes.user import get_current_active_user
 import json
+from starlette.concurrency import run_in_threadpool
 
 event_router = APIRouter()
 
@@ -190,7 +191,8 @@ async def send_task_to_queue(current_user: Annotated[UserOut, Depends(get_curren
         body["task"] = task
         body["model_name"] = model_name
         body = json.dumps(body)
-        send_task(body)
+        # Публикация блокирующая (pika), выполняем её вне event loop
+        await run_in_threadpool(send_task, body)
         return {"message": "Task sent successfully!"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=e)